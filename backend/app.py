@@ -3,13 +3,41 @@ import streamlit as st
 import os
 import re
 from datetime import datetime
-from pypdf import PdfReader
-from chunker import chunk_text, preprocess_uploaded_doc
-from embedder import embed_and_store, initialize_vectorstore
-from llm_agent import rag_query
-from config import SCRAPE_LINKS, FAISS_INDEX_PATH, PDF_DIR
-from initializer import initial_vectorization
-from supabase_client import supabase, supabase_admin
+from config import FAISS_INDEX_PATH, PDF_DIR, UPLOAD_COLLECTION, BACKEND_API_URL, BACKEND_TIMEOUT, SESSION_LIST_TTL
+from auth import check_password, get_password_hash, create_access_token
+
+# Streamlit re-runs this script on every interaction: anything expensive lives
+# behind st.cache_resource (one per process) or st.cache_data (with a TTL),
+# and the RAG stack is only imported when answers are produced in-process.
+
+@st.cache_resource
+def get_supabase_clients():
+    from supabase_client import supabase, supabase_admin
+    return supabase, supabase_admin
+
+@st.cache_resource(show_spinner="Loading the knowledge base...")
+def warm_up_rag():
+    """
+    Load the embedding model and index shards once per process (local answering
+    only). This is only a warm-up: rag_query reads both through vectorstore's
+    own process-wide caches, so nothing is returned.
+    """
+    from vectorstore import get_embeddings, load_collections
+    get_embeddings()
+    load_collections()
+
+@st.cache_resource
+def get_backend_session():
+    """Keep-alive connection pool to the FastAPI backend, shared by all browser sessions"""
+    import requests
+    from requests.adapters import HTTPAdapter
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+supabase, supabase_admin = get_supabase_clients()
 
 # Email regex
 EMAIL_REGEX = re.compile(r"^[0-9]{2}[A-Za-z]{2}[0-9]{3}@kpriet\.ac\.in$", re.IGNORECASE)
@@ -24,8 +52,10 @@ def create_new_session(email):
         "email": email,
         "title": title
     }).execute()
+    get_user_sessions.clear()
     return resp.data[0]["id"] if resp.data else None
 
+@st.cache_data(ttl=SESSION_LIST_TTL, show_spinner=False)
 def get_user_sessions(email):
     resp = supabase.table("chat_sessions").select("id,title")\
            .eq("email", email).order("updated_at", desc=True).execute()
@@ -64,6 +94,59 @@ def save_message(session_id, email, role, content):
     }).execute()
     supabase_admin.table("chat_sessions").update({"updated_at": "now()"}).eq("id", session_id).execute()
 
+def backend_token():
+    """JWT for the FastAPI backend, minted for the logged-in user"""
+    if "api_token" not in st.session_state:
+        st.session_state["api_token"] = create_access_token(
+            data={"sub": st.session_state["email"], "role": st.session_state["role"]}
+        )
+    return st.session_state["api_token"]
+
+def answer_via_backend(session_id, prompt):
+    """Ask the FastAPI backend, which also stores both messages"""
+    url = f"{BACKEND_API_URL}/api/chat/{session_id}"
+    for attempt in range(2):
+        resp = get_backend_session().post(
+            url,
+            json={"message": prompt},
+            headers={"Authorization": f"Bearer {backend_token()}"},
+            timeout=BACKEND_TIMEOUT
+        )
+        if resp.status_code == 401 and attempt == 0:
+            # Expired token: mint a new one and retry once
+            st.session_state.pop("api_token", None)
+            continue
+        resp.raise_for_status()
+        return resp.json()["response"]
+
+def answer(session_id, email, prompt):
+    """Answer a prompt and persist both turns (the backend persists them itself)"""
+    if BACKEND_API_URL:
+        import requests
+        try:
+            return answer_via_backend(session_id, prompt)
+        except requests.Timeout:
+            # The backend may still finish and store both messages itself
+            st.error("The backend is taking longer than usual; the answer will appear in this chat once it is ready.")
+            return "Still working on this one. Please check back in a moment."
+        except Exception as e:
+            st.error(f"Backend error: {e}")
+            # The backend never stored the exchange, so keep the question in the history
+            response = "I apologize, but I encountered an error processing your request. Please try again."
+            try:
+                save_message(session_id, email, "user", prompt)
+                save_message(session_id, email, "assistant", response)
+            except Exception as save_error:
+                st.error(f"Could not save your message: {save_error}")
+            return response
+
+    from llm_agent import rag_query
+    warm_up_rag()
+    save_message(session_id, email, "user", prompt)
+    response = rag_query(prompt)
+    save_message(session_id, email, "assistant", response)
+    return response
+
 # === Auth ===
 def signup():
     st.title("Sign Up")
@@ -80,7 +163,7 @@ def signup():
             st.error("Email must be: 22AD060@kpriet.ac.in")
             return
         
-        data = {"email": email, "name": name, "password": password, "role": role}
+        data = {"email": email, "name": name, "password": get_password_hash(password), "role": role}
         try:
             supabase_admin.table("users").insert(data).execute()
             st.success(f"Account created for {name}!")
@@ -97,7 +180,7 @@ def login():
             st.error("Invalid email format.")
             return
         resp = supabase.table("users").select("password,role,name").eq("email", email).execute()
-        if resp.data and resp.data[0]["password"] == password:
+        if resp.data and check_password(password, resp.data[0]["password"]):
             st.session_state.update({
                 "logged_in": True,
                 "email": email,
@@ -121,7 +204,7 @@ def chatbot_dashboard():
     selected = st.sidebar.selectbox("Select chat", list(options.keys()), key="session_select")
 
     if st.sidebar.button("Sign Out"):
-        for key in ["logged_in", "role", "email", "name", "current_session_id", "chat_history"]:
+        for key in ["logged_in", "role", "email", "name", "current_session_id", "chat_history", "api_token"]:
             st.session_state.pop(key, None)
         st.rerun()
 
@@ -169,38 +252,40 @@ def chatbot_dashboard():
         })
         with st.chat_message("user"):
             st.write(f"**{st.session_state['name']}**: {prompt}")
-        save_message(st.session_state.current_session_id, st.session_state["email"], "user", prompt)
 
         with st.chat_message("assistant"):
             with st.spinner("Thinking..."):
-                response = rag_query(prompt)
+                response = answer(st.session_state.current_session_id, st.session_state["email"], prompt)
             st.write(response)
             st.session_state.chat_history.append({
                 "role": "assistant",
                 "content": response,
                 "name": "Assistant"
             })
-            save_message(st.session_state.current_session_id, st.session_state["email"], "assistant", response)
 
 def admin_dashboard():
     st.title("Admin Panel")
     st.sidebar.button("Sign Out", on_click=lambda: [
         st.session_state.pop(k, None) for k in 
-        ["logged_in", "role", "email", "name", "current_session_id", "chat_history"]
+        ["logged_in", "role", "email", "name", "current_session_id", "chat_history", "api_token"]
     ] + [st.rerun()])
 
     uploaded = st.file_uploader("Upload PDF", type="pdf")
     if uploaded:
+        from embedder import embed_pdf
+
         path = os.path.join(PDF_DIR, uploaded.name)
         with open(path, "wb") as f:
             f.write(uploaded.getbuffer())
-        text = " ".join([p.extract_text() for p in PdfReader(uploaded).pages if p.extract_text()])
-        chunks = preprocess_uploaded_doc(text)
-        embed_and_store(chunks)
-        st.success(f"Embedded: {uploaded.name}")
+        if embed_pdf(path, source=uploaded.name, collection=UPLOAD_COLLECTION) is None:
+            st.error(f"{uploaded.name} contains no extractable text")
+        else:
+            st.success(f"Embedded: {uploaded.name}")
 
 def main():
-    if not os.path.exists(FAISS_INDEX_PATH):
+    # With a backend configured, it owns the index; this process stays thin
+    if not BACKEND_API_URL and not os.path.exists(FAISS_INDEX_PATH):
+        from initializer import initial_vectorization
         with st.spinner("Initializing knowledge base..."):
             initial_vectorization()
         st.success("Knowledge base ready!")
@@ -1,18 +1,31 @@
 from datetime import datetime, timedelta
 from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import hashlib
+import time
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 import os
 from dotenv import load_dotenv
+from ttl_cache import TTLCache
 
 load_dotenv()
 
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_HOURS = 24
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 4096))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 4))
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt is deliberately slow; keep it off the event loop
+_password_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+
+# sha256(token) -> decoded payload, kept until the token expires
+_token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
     return pwd_context.verify(plain_password, hashed_password)
@@ -21,6 +34,28 @@ def get_password_hash(password: str) -> str:
     """Hash a password"""
     return pwd_context.hash(password)
 
+def is_password_hash(value: Optional[str]) -> bool:
+    """Check whether a stored password is a hash rather than legacy plain text"""
+    return bool(value) and pwd_context.identify(value) is not None
+
+def check_password(plain_password: str, stored_password: Optional[str]) -> bool:
+    """Verify against a bcrypt hash, falling back to plain-text comparison for legacy rows"""
+    if not stored_password:
+        return False
+    if is_password_hash(stored_password):
+        return verify_password(plain_password, stored_password)
+    return plain_password == stored_password
+
+async def check_password_async(plain_password: str, stored_password: Optional[str]) -> bool:
+    """check_password on the bcrypt thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_pool, check_password, plain_password, stored_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash on the bcrypt thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_pool, get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -33,9 +68,24 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 def decode_access_token(token: str) -> Optional[dict]:
-    """Decode and verify a JWT token"""
+    """Decode and verify a JWT token, reusing earlier decodes until the token expires"""
+    key = hashlib.sha256(token.encode()).hexdigest()
+    payload = _token_cache.get(key)
+    if payload is not None:
+        return payload
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         return None
+
+    exp = payload.get("exp")
+    if exp is not None:
+        remaining = exp - time.time()
+        if remaining > 0:
+            _token_cache.set(key, payload, ttl=remaining)
+    return payload
+
+def clear_token_cache():
+    """Forget all cached token decodes (e.g. after rotating SECRET_KEY)"""
+    _token_cache.clear()
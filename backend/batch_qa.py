@@ -0,0 +1,179 @@
+# batch_qa.py
+"""
+Answer a file of questions in one go, for pre-generating FAQ answers and
+spot-checking quality after a re-index.
+
+All queries are embedded in one batch and searched with one FAISS call
+per shard; LLM calls then run with bounded concurrency. Each answer is
+written as a JSON line with the retrieved chunk ids and per-stage timings.
+
+Usage:
+    python batch_qa.py faq.txt --out answers.jsonl
+    python batch_qa.py faq.jsonl --k 5 --concurrency 8 --collections documents
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import BATCH_QA_CONCURRENCY, RERANK_ENABLED, RERANK_CANDIDATES
+from guardrails import check_query
+from llm_agent import build_context, generate_answer
+from metrics import stage, start_trace, end_trace
+from reranker import rerank as rerank_docs
+import retriever
+
+
+def parse_queries(lines):
+    """
+    Queries from a text file (one per line) or JSONL ({"id", "query"} per line).
+
+    Returns:
+        List of {"id", "query"} dicts
+    """
+    queries = []
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("{"):
+            item = json.loads(line)
+            queries.append({"id": item.get("id", number), "query": item["query"]})
+        else:
+            queries.append({"id": number, "query": line})
+    return queries
+
+
+def _chunk_info(doc, score):
+    return {
+        "chunk_id": doc.metadata.get("chunk_id"),
+        "collection": doc.metadata.get("collection"),
+        "source": doc.metadata.get("source"),
+        "page": doc.metadata.get("page"),
+        "score": float(score)
+    }
+
+
+def _timings(trace):
+    totals = {}
+    for name, seconds in trace:
+        totals[name] = round(totals.get(name, 0.0) + seconds * 1000, 2)
+    return totals
+
+
+def _answer_one(item, results, k, rerank, use_complex_model):
+    """Rerank, build the prompt and call the LLM for one query (runs on a worker thread)"""
+    token = start_trace()
+    start = time.perf_counter()
+    record = {"id": item["id"], "query": item["query"]}
+    try:
+        docs = [doc for doc, _ in results]
+        if rerank:
+            with stage("rerank"):
+                docs = rerank_docs(item["query"], docs, k)
+        scores = {id(doc): score for doc, score in results}
+        record["chunks"] = [_chunk_info(doc, scores[id(doc)]) for doc in docs]
+        record["answer"] = generate_answer(item["query"], build_context(docs), use_complex_model=use_complex_model)
+    except Exception as e:
+        record.update(answer=None, error=str(e))
+    trace = end_trace(token)
+    record["timings_ms"] = {**_timings(trace), "total": round((time.perf_counter() - start) * 1000, 2)}
+    return record
+
+
+def answer_batch(queries, k=3, collections=None, rerank=None, concurrency=BATCH_QA_CONCURRENCY, use_complex_model=False):
+    """
+    Answer many queries with one embedding batch and one vectorized search.
+
+    Args:
+        queries: List of {"id", "query"} dicts (see parse_queries)
+        k: Chunks per answer
+        collections: Only search these collections (default: all)
+        rerank: Rerank RERANK_CANDIDATES chunks down to k (defaults to RERANK_ENABLED)
+        concurrency: Maximum LLM calls in flight
+        use_complex_model: Use the larger model for the answers
+
+    Returns:
+        (records in input order, batch-level timings in ms)
+    """
+    if not queries:
+        return [], {}
+    rerank = RERANK_ENABLED if rerank is None else rerank
+
+    # Refuse harmful queries before paying for retrieval or any LLM call
+    start = time.perf_counter()
+    records = [None] * len(queries)
+    allowed = []
+    for i, item in enumerate(queries):
+        blocked = check_query(item["query"])
+        if blocked:
+            records[i] = {"id": item["id"], "query": item["query"], "answer": blocked, "blocked": True, "chunks": []}
+        else:
+            allowed.append(i)
+    guardrails_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    embeddings = retriever.embed_documents([queries[i]["query"] for i in allowed]) if allowed else []
+    embed_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    results = retriever.search_batch(embeddings, k=max(k, RERANK_CANDIDATES) if rerank else k, collections=collections)
+    search_ms = (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="batch-qa") as pool:
+        futures = {i: pool.submit(_answer_one, queries[i], rows, k, rerank, use_complex_model) for i, rows in zip(allowed, results)}
+        for i, future in futures.items():
+            records[i] = future.result()
+
+    batch_timings = {
+        "guardrails": round(guardrails_ms, 2),
+        "embed_batch": round(embed_ms, 2),
+        "search_batch": round(search_ms, 2),
+        "queries": len(queries),
+        "blocked": len(queries) - len(allowed)
+    }
+    return records, batch_timings
+
+
+def write_jsonl(records, out):
+    for record in records:
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a file of queries and write JSONL results")
+    parser.add_argument("queries", help="Text file (one query per line) or JSONL with {\"id\", \"query\"}")
+    parser.add_argument("--out", help="Output JSONL file (default: stdout)")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--collections", nargs="+", help="Collections to search (default: all)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_QA_CONCURRENCY, help="Maximum concurrent LLM calls")
+    parser.add_argument("--rerank", choices=("on", "off"), help="Override RERANK_ENABLED")
+    parser.add_argument("--complex-model", action="store_true", help="Use the larger answer model")
+    args = parser.parse_args()
+
+    with open(args.queries, encoding="utf-8") as f:
+        queries = parse_queries(f)
+    rerank = None if args.rerank is None else args.rerank == "on"
+
+    start = time.perf_counter()
+    records, batch_timings = answer_batch(
+        queries, k=args.k, collections=args.collections, rerank=rerank,
+        concurrency=args.concurrency, use_complex_model=args.complex_model
+    )
+    elapsed = time.perf_counter() - start
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            write_jsonl(records, f)
+    else:
+        write_jsonl(records, sys.stdout)
+
+    errors = sum(1 for r in records if r.get("error"))
+    print(f"Answered {len(records)} queries in {elapsed:.1f}s ({errors} errors); "
+          f"embed {batch_timings.get('embed_batch', 0):.0f} ms, search {batch_timings.get('search_batch', 0):.0f} ms",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
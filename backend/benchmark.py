@@ -0,0 +1,337 @@
+# benchmark.py
+"""
+End-to-end RAG benchmark with local stand-ins for Groq, Supabase and Redis.
+
+Measures HTML extraction throughput on saved pages, ingestion
+throughput (chunk_text, embed_and_store), rag_query
+latency across k and index sizes, and concurrent /api/chat throughput
+through the FastAPI app. Results are written as JSON for comparing runs.
+
+Usage:
+    python benchmark.py --pdf-dir pdfs --snapshot snapshots/site
+    python benchmark.py --record-snapshot https://www.kpriet.ac.in --snapshot snapshots/site
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+from fakes import install_fakes, record_snapshot
+
+DEFAULT_QUERIES = [
+    "What are the admission requirements?",
+    "When does the semester exam start?",
+    "What is the attendance policy?",
+    "Which departments are offered?",
+    "How do I apply for a scholarship?",
+    "What are the library timings?",
+    "Who is the head of the AI & DS department?",
+    "What is the grading system?",
+]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(latencies):
+    """Latency summary in milliseconds"""
+    if not latencies:
+        return {"count": 0}
+    ms = [v * 1000 for v in latencies]
+    return {
+        "count": len(ms),
+        "mean_ms": round(statistics.mean(ms), 3),
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "max_ms": round(max(ms), 3),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def load_corpus(pdf_dir, site):
+    """Return (pdf_texts, site_texts) from the PDFs on disk and the recorded snapshot"""
+    from pypdf import PdfReader
+    from realtime_scraper import scrape_website
+
+    pdf_texts = []
+    if pdf_dir and os.path.isdir(pdf_dir):
+        for filename in sorted(os.listdir(pdf_dir)):
+            if filename.endswith(".pdf"):
+                reader = PdfReader(os.path.join(pdf_dir, filename))
+                text = " ".join([page.extract_text() for page in reader.pages if page.extract_text()])
+                if text.strip():
+                    pdf_texts.append(text)
+
+    site_texts = []
+    if site is not None:
+        for url in site.urls():
+            text = scrape_website(url, use_cache=False)
+            if text:
+                site_texts.append(text)
+    return pdf_texts, site_texts
+
+
+def _bs4_extract(markup):
+    """The previous BeautifulSoup html.parser extraction, kept as a baseline"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(markup, "html.parser")
+    for tag in soup(["script", "style", "noscript", "header", "footer", "nav"]):
+        tag.decompose()
+    texts = []
+    for tag in soup.find_all(["h1", "h2", "h3", "h4", "h5", "p", "li", "td", "th", "span", "div"]):
+        txt = tag.get_text(separator=" ", strip=True)
+        if txt and len(txt) > 10:
+            texts.append(txt)
+    return " ".join(texts)
+
+
+def bench_extraction(site, repeat):
+    """HTML-to-text throughput on the saved pages, lxml single pass vs the bs4 baseline"""
+    from html_extract import extract_text
+
+    pages = []
+    for url in site.urls():
+        response = site.get(url)
+        if response.status_code == 200:
+            pages.append(response.content)
+    total_bytes = sum(len(p) for p in pages)
+
+    extractors = {"html_extract": extract_text}
+    try:
+        import bs4  # noqa: F401
+        extractors["bs4_baseline"] = _bs4_extract
+    except ImportError:
+        pass
+
+    results = {}
+    for name, extract in extractors.items():
+        output_chars = 0
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for page in pages:
+                output_chars += len(extract(page))
+        elapsed = time.perf_counter() - start
+        results[name] = {
+            "pages": len(pages) * repeat,
+            "seconds": round(elapsed, 4),
+            "pages_per_sec": round(len(pages) * repeat / elapsed, 2) if elapsed else None,
+            "mb_per_sec": round(total_bytes * repeat / elapsed / 1e6, 3) if elapsed else None,
+            "output_chars_per_page": round(output_chars / (len(pages) * repeat), 1) if pages else 0,
+        }
+        print(f"  {name}: {results[name]['pages_per_sec']} pages/s")
+    return results
+
+
+def bench_ingestion(texts, index_path):
+    from chunker import chunk_text
+    from embedder import embed_and_store
+
+    chars = sum(len(t) for t in texts)
+    start = time.perf_counter()
+    chunks = chunk_text(texts)
+    chunk_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    embed_and_store(chunks, index_path=index_path)
+    embed_seconds = time.perf_counter() - start
+
+    return chunks, {
+        "documents": len(texts),
+        "characters": chars,
+        "chunks": len(chunks),
+        "chunk_text_seconds": round(chunk_seconds, 4),
+        "chunk_text_chars_per_sec": round(chars / chunk_seconds, 1) if chunk_seconds else None,
+        "embed_and_store_seconds": round(embed_seconds, 4),
+        "embed_and_store_chunks_per_sec": round(len(chunks) / embed_seconds, 2) if embed_seconds else None,
+    }
+
+
+def bench_retrieval(chunks, queries, ks, sizes, repeat, work_dir, rerank_modes=(False,), use_cache=False):
+    import retriever
+    import vectorstore
+    from embedder import embed_and_store
+    from llm_agent import rag_query
+
+    results = []
+    for fraction in sizes:
+        subset = chunks[:max(1, int(len(chunks) * fraction))]
+        index_path = os.path.join(work_dir, f"index_{fraction}")
+        embed_and_store(subset, index_path=index_path)
+        vectorstore.FAISS_INDEX_PATH = index_path
+
+        for rerank in rerank_modes:
+            for k in ks:
+                latencies = []
+                for _ in range(repeat):
+                    for query in queries:
+                        if not use_cache:
+                            # Otherwise every pass after the first only measures embedding/result cache hits
+                            retriever.clear_caches()
+                        start = time.perf_counter()
+                        rag_query(query, k=k, rerank=rerank)
+                        latencies.append(time.perf_counter() - start)
+                results.append({"index_chunks": len(subset), "k": k, "rerank": rerank, "retriever_cache": use_cache, **summarize(latencies)})
+                print(f"  rag_query k={k} rerank={rerank} chunks={len(subset)}: p50={results[-1]['p50_ms']}ms")
+    return results
+
+
+async def _chat_run(app, token, session_id, queries, total, concurrency):
+    import httpx
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def one(i):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                resp = await client.post(
+                    f"/api/chat/{session_id}",
+                    json={"message": queries[i % len(queries)]},
+                    headers={"Authorization": f"Bearer {token}"},
+                    timeout=120,
+                )
+                latencies.append(time.perf_counter() - start)
+                if resp.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "requests_per_sec": round(total / elapsed, 2) if elapsed else None,
+        **summarize(latencies),
+    }
+
+
+def bench_chat(fakes, queries, concurrency_levels, total):
+    from auth import create_access_token
+    from main import app
+    import readiness
+
+    # The ASGI transport doesn't run startup events; the index was built by the benchmark
+    readiness.set_status("ready", ready=True)
+
+    email = "22AD000@kpriet.ac.in"
+    fakes.supabase.table("users").insert({"email": email, "name": "Bench", "password": "bench", "role": "user"}).execute()
+    session_id = fakes.supabase.table("chat_sessions").insert({"email": email, "title": "bench"}).execute().data[0]["id"]
+    token = create_access_token(data={"sub": email, "role": "user"})
+
+    results = []
+    for concurrency in concurrency_levels:
+        result = asyncio.run(_chat_run(app, token, session_id, queries, total, concurrency))
+        results.append(result)
+        print(f"  /api/chat c={concurrency}: {result['requests_per_sec']} req/s, p95={result['p95_ms']}ms")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the RAG pipeline with local fakes")
+    parser.add_argument("--pdf-dir", default="pdfs")
+    parser.add_argument("--snapshot", help="Directory with a recorded site snapshot (index.json + HTML)")
+    parser.add_argument("--record-snapshot", nargs="+", metavar="URL", help="Record these URLs into --snapshot and exit")
+    parser.add_argument("--queries", help="Text file with one query per line")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5, 10])
+    parser.add_argument("--sizes", type=float, nargs="+", default=[0.25, 0.5, 1.0], help="Index sizes as fractions of the corpus")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--rerank", action="store_true", help="Also measure rag_query with the cross-encoder rerank stage")
+    parser.add_argument("--retriever-cache", action="store_true", help="Keep the retriever's embedding/result caches between timed queries")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=64, help="Chat requests per concurrency level")
+    parser.add_argument("--groq-latency", type=float, default=0.0, help="Seconds added to each fake Groq call")
+    parser.add_argument("--supabase-latency", type=float, default=0.0, help="Seconds added to each fake Supabase call")
+    parser.add_argument("--skip", nargs="*", default=[], choices=["extraction", "retrieval", "chat"])
+    parser.add_argument("--out", help="Output JSON path (default: benchmark_results/<timestamp>.json)")
+    args = parser.parse_args()
+
+    if args.record_snapshot:
+        if not args.snapshot:
+            parser.error("--record-snapshot requires --snapshot")
+        pages = record_snapshot(args.record_snapshot, args.snapshot)
+        print(f"Recorded {len(pages)} pages into {args.snapshot}")
+        return
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries) as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    fakes = install_fakes(groq_latency=args.groq_latency, supabase_latency=args.supabase_latency, snapshot_dir=args.snapshot)
+    work_dir = tempfile.mkdtemp(prefix="rag_bench_")
+
+    import vectorstore
+    vectorstore.FAISS_INDEX_PATH = os.path.join(work_dir, "index_full")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        }
+    }
+
+    try:
+        print("Loading corpus...")
+        pdf_texts, site_texts = load_corpus(args.pdf_dir, fakes.site)
+        texts = pdf_texts + site_texts
+        report["corpus"] = {"pdfs": len(pdf_texts), "pages": len(site_texts)}
+
+        if fakes.site is not None and "extraction" not in args.skip:
+            print("Extraction...")
+            report["extraction"] = bench_extraction(fakes.site, args.repeat)
+
+        print("Ingestion...")
+        chunks, report["ingestion"] = bench_ingestion(texts, vectorstore.FAISS_INDEX_PATH)
+
+        if "retrieval" not in args.skip:
+            print("Retrieval...")
+            rerank_modes = (False, True) if args.rerank else (False,)
+            report["retrieval"] = bench_retrieval(chunks, queries, args.k, args.sizes, args.repeat, work_dir, rerank_modes, args.retriever_cache)
+            vectorstore.FAISS_INDEX_PATH = os.path.join(work_dir, "index_full")
+
+        if "chat" not in args.skip:
+            print("Chat...")
+            report["chat"] = bench_chat(fakes, queries, args.concurrency, args.requests)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    out = args.out or os.path.join("benchmark_results", f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,135 @@
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_experimental.text_splitter import SemanticChunker
-from langchain.embeddings import HuggingFaceEmbeddings
+import re
+from vectorstore import get_embeddings
+from profiling import profiled
 
+@profiled("chunk_text")
 def chunk_text(texts):
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from langchain_experimental.text_splitter import SemanticChunker
+
     initial_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=100)
     initial_chunks = initial_splitter.split_text('\n\n'.join(texts))
-    
-    embeddings = HuggingFaceEmbeddings(model_name="BAAI/bge-small-en-v1.5")
-    semantic_chunker = SemanticChunker(embeddings)
+
+    semantic_chunker = SemanticChunker(get_embeddings())
     semantic_chunks = []
     for chunk in initial_chunks:
         semantic_chunks.extend(semantic_chunker.split_text(chunk))
-    
+
     return semantic_chunks
 
 def preprocess_uploaded_doc(doc_content):
-    return chunk_text([doc_content])
\ No newline at end of file
+    return chunk_text([doc_content])
+
+# === Structure-aware PDF chunking ===
+PDF_CHUNK_SIZE = 800
+PDF_CHUNK_OVERLAP = 100
+
+_NUMBERED_HEADING = re.compile(r"^(\d+(\.\d+)*\.?|[IVXLC]+\.|[A-Z]\.)\s+\S")
+_NAMED_HEADING = re.compile(r"^(chapter|section|unit|module|part|annexure|appendix)\b", re.IGNORECASE)
+_CELL_BREAK = re.compile(r"\s{2,}|\t|\|")
+
+def is_heading(line):
+    """Heuristic heading test for one line of extracted PDF text"""
+    if len(line) > 90 or line.endswith((".", ",", ";")):
+        return False
+    words = line.split()
+    if not words or len(words) > 12:
+        return False
+    letters = [c for c in line if c.isalpha()]
+    if len(letters) >= 3 and all(c.isupper() for c in letters):
+        return True
+    return bool(_NUMBERED_HEADING.match(line) or _NAMED_HEADING.match(line))
+
+def _is_table_row(line):
+    """Three or more cells separated by wide gaps, or any tab/pipe-separated cells"""
+    cells = [c for c in _CELL_BREAK.split(line) if c.strip()]
+    return len(cells) >= 3 or (len(cells) == 2 and ("|" in line or "\t" in line))
+
+def _page_blocks(text):
+    """
+    Split one page's text into structural blocks: ("heading", line),
+    ("table", rows) or ("paragraph", text). Table rows stay one per line.
+    """
+    blocks = []
+    paragraph, table = [], []
+
+    def flush():
+        if paragraph:
+            blocks.append(("paragraph", " ".join(paragraph)))
+            paragraph.clear()
+        if table:
+            blocks.append(("table", "\n".join(table)))
+            table.clear()
+
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line:
+            flush()
+        elif is_heading(line):
+            flush()
+            blocks.append(("heading", line))
+        elif _is_table_row(line):
+            if paragraph:
+                flush()
+            table.append(" | ".join(c.strip() for c in _CELL_BREAK.split(line) if c.strip()))
+        else:
+            if table:
+                flush()
+            paragraph.append(line)
+    flush()
+    return blocks
+
+def _split_long(text, chunk_size, overlap):
+    """Split an oversized block at line/sentence/word boundaries"""
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=overlap, separators=["\n", ". ", " ", ""])
+    return splitter.split_text(text)
+
+def iter_pdf_chunks(pdf, chunk_size=PDF_CHUNK_SIZE, overlap=PDF_CHUNK_OVERLAP):
+    """
+    Chunk a PDF one page at a time, keeping page numbers and section headings.
+
+    Chunks never cross a page or a heading; blocks are packed up to
+    chunk_size characters and only blocks longer than that are split
+    further. Only one page's text is held in memory at a time.
+
+    Args:
+        pdf: Path, binary stream or pypdf.PdfReader
+
+    Yields:
+        (chunk text, {"page": 1-based page number, "section": heading or None})
+    """
+    from pypdf import PdfReader
+
+    reader = pdf if isinstance(pdf, PdfReader) else PdfReader(pdf)
+    section = None
+    for number, page in enumerate(reader.pages, start=1):
+        # The heading (if any) opens each chunk of its section so the chunk reads in context
+        parts, has_body = [section] if section else [], False
+
+        def emit():
+            if has_body:
+                yield "\n".join(parts), {"page": number, "section": section}
+            parts.clear()
+            if section:
+                parts.append(section)
+
+        for kind, block in _page_blocks(page.extract_text() or ""):
+            if kind == "heading":
+                if has_body:
+                    yield from emit()
+                section = block
+                parts[:] = [block]
+                has_body = False
+            elif len(block) > chunk_size:
+                yield from emit()
+                for piece in _split_long(block, chunk_size, overlap):
+                    yield (f"{section}\n{piece}" if section else piece), {"page": number, "section": section}
+                has_body = False
+            else:
+                if has_body and sum(len(p) + 1 for p in parts) + len(block) > chunk_size:
+                    yield from emit()
+                parts.append(block)
+                has_body = True
+        if has_body:
+            yield from emit()
@@ -8,5 +8,81 @@ SCRAPE_LINKS = os.getenv("SCRAPE_LINKS", "").split(",")
 FAISS_INDEX_PATH = os.getenv("FAISS_INDEX_PATH", "./faiss_index")
 PDF_DIR = os.getenv("PDF_DIR", "./pdfs")
 
+# Index shards ("collections") under FAISS_INDEX_PATH, searched in parallel
+WEBSITE_COLLECTION = os.getenv("WEBSITE_COLLECTION", "website")
+UPLOAD_COLLECTION = os.getenv("UPLOAD_COLLECTION", "documents")
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", 4))
+
+# Shared retrieval service: when RETRIEVAL_SERVICE_URL is set, workers embed/search through it
+RETRIEVAL_SERVICE_URL = os.getenv("RETRIEVAL_SERVICE_URL", "").rstrip("/")
+RETRIEVAL_TIMEOUT = float(os.getenv("RETRIEVAL_TIMEOUT_SECONDS", 10))
+RETRIEVAL_POOL_SIZE = int(os.getenv("RETRIEVAL_POOL_SIZE", 32))
+RETRIEVAL_HOST = os.getenv("RETRIEVAL_HOST", "127.0.0.1")
+RETRIEVAL_PORT = int(os.getenv("RETRIEVAL_PORT", 8100))
+RETRIEVAL_BATCH_SIZE = int(os.getenv("RETRIEVAL_BATCH_SIZE", 32))
+RETRIEVAL_BATCH_WAIT_MS = float(os.getenv("RETRIEVAL_BATCH_WAIT_MS", 5))
+
+# LRU caches in the retriever: query embeddings, and top-k results per index version
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", 2048))
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", 1024))
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL_SECONDS", 300))
+
+# Conversation window used for follow-up questions
+HISTORY_MAX_TURNS = int(os.getenv("HISTORY_MAX_TURNS", 6))
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", 800))
+HISTORY_CACHE_SIZE = int(os.getenv("HISTORY_CACHE_SIZE", 1024))
+HISTORY_CACHE_TTL = int(os.getenv("HISTORY_CACHE_TTL_SECONDS", 1800))
+
+# User profile cache
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 1024))
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL_SECONDS", 300))
+
+# Adds a Server-Timing header with per-stage durations to every API response
+TIMING_HEADER_ENABLED = os.getenv("TIMING_HEADER_ENABLED", "false").lower() == "true"
+
+# Identical chat queries (same normalized text, collections and history) in flight at once share one answer
+CHAT_COALESCE_ENABLED = os.getenv("CHAT_COALESCE_ENABLED", "true").lower() == "true"
+
+# Batch question answering (batch_qa.py and /api/admin/batch-qa)
+BATCH_QA_CONCURRENCY = int(os.getenv("BATCH_QA_CONCURRENCY", 4))
+BATCH_QA_MAX_QUERIES = int(os.getenv("BATCH_QA_MAX_QUERIES", 500))
+
+# Guardrails: optional JSON list or one-pattern-per-line file ("re:" entries are regular expressions)
+GUARDRAIL_PATTERNS_FILE = os.getenv("GUARDRAIL_PATTERNS_FILE")
+# Second stage: block queries whose embedding is close to a known harmful request
+GUARDRAIL_CLASSIFIER_ENABLED = os.getenv("GUARDRAIL_CLASSIFIER_ENABLED", "false").lower() == "true"
+GUARDRAIL_CLASSIFIER_THRESHOLD = float(os.getenv("GUARDRAIL_CLASSIFIER_THRESHOLD", 0.85))
+
+# Chunks embedded per model call when ingesting; large PDFs are read and embedded one batch at a time
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 64))
+
+# Drop exact and near-duplicate chunks (SimHash bit distance) before embedding
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+DEDUP_MAX_DISTANCE = int(os.getenv("DEDUP_MAX_DISTANCE", 3))
+
+# Optional second retrieval stage: fetch RERANK_CANDIDATES chunks, rerank with a CPU cross-encoder
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", 30))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", 16))
+RERANK_BUDGET_MS = int(os.getenv("RERANK_BUDGET_MS", 150))
+
+# "background" builds/loads the index on a worker thread while the API serves; "blocking" waits before serving
+STARTUP_MODE = os.getenv("STARTUP_MODE", "background").lower()
+
+# Streamlit front end: answer through the FastAPI backend when BACKEND_API_URL is set
+BACKEND_API_URL = os.getenv("BACKEND_API_URL", "").rstrip("/")
+BACKEND_TIMEOUT = float(os.getenv("BACKEND_TIMEOUT_SECONDS", 60))
+SESSION_LIST_TTL = int(os.getenv("SESSION_LIST_TTL_SECONDS", 30))
+
+# Opt-in profiling of ingestion and query hot paths (also switchable at runtime via /api/admin/profiling)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILING_MODE = os.getenv("PROFILING_MODE", "sample").lower()  # "sample" (speedscope) or "cprofile" (pstats)
+PROFILING_DIR = os.getenv("PROFILING_DIR", "./profiles")
+PROFILING_TARGETS = [t for t in os.getenv("PROFILING_TARGETS", "").split(",") if t]  # empty = all
+PROFILING_RATE = float(os.getenv("PROFILING_RATE", 1.0))  # fraction of calls profiled
+PROFILING_INTERVAL_MS = float(os.getenv("PROFILING_INTERVAL_MS", 5))
+PROFILING_MEMORY = os.getenv("PROFILING_MEMORY", "false").lower() == "true"  # tracemalloc snapshots
+
 if not GROQ_API_KEY:
     raise ValueError("GROQ_API_KEY is required in .env")
\ No newline at end of file
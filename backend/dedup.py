@@ -0,0 +1,163 @@
+import hashlib
+import re
+
+_WORD = re.compile(r"\w+")
+
+# Near-duplicate threshold in differing SimHash bits (out of 64)
+DEFAULT_MAX_DISTANCE = 3
+
+
+def normalize(text: str) -> str:
+    """Lowercase and collapse punctuation/whitespace so trivial differences hash the same"""
+    return " ".join(_WORD.findall(text.lower()))
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1(normalize(text).encode()).hexdigest()
+
+
+def _hash64(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "big")
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """64-bit SimHash over word shingles"""
+    words = normalize(text).split()
+    if len(words) < shingle_size:
+        shingles = [" ".join(words)] if words else []
+    else:
+        shingles = [" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+
+    weights = [0] * 64
+    for shingle in shingles:
+        h = _hash64(shingle)
+        for bit in range(64):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+
+    value = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            value |= 1 << bit
+    return value
+
+
+class Deduplicator:
+    """
+    Drops exact (normalized) duplicates and SimHash near-duplicates.
+
+    Fingerprints are split into max_distance + 1 bands; by the pigeonhole
+    principle two fingerprints within max_distance bits share at least one
+    identical band, so only those candidates are compared.
+    """
+
+    def __init__(self, max_distance: int = DEFAULT_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.bands = max(1, max_distance + 1)
+        self.band_bits = 64 // self.bands
+        # content hash -> number of registered texts with it
+        self._hashes = {}
+        self._tables = [{} for _ in range(self.bands)]
+        # key (e.g. a chunk id) -> (content hash, fingerprint), so a text can be forgotten again
+        self._keys = {}
+        self.stats = {"seen": 0, "kept": 0, "empty": 0, "exact": 0, "near": 0}
+
+    def copy(self):
+        """Independent copy of the registered texts (with fresh stats)"""
+        other = Deduplicator(self.max_distance)
+        other._hashes = dict(self._hashes)
+        other._tables = [{band: list(bucket) for band, bucket in table.items()} for table in self._tables]
+        other._keys = dict(self._keys)
+        return other
+
+    def subset(self, keys):
+        """Independent copy holding only the texts registered under keys (with fresh stats)"""
+        other = Deduplicator(self.max_distance)
+        other.merge(self, keys)
+        return other
+
+    def merge(self, other, keys):
+        """Register the texts other holds under keys, without hashing them again"""
+        for key in keys:
+            entry = other._keys.get(key)
+            if entry is not None:
+                self._register(entry[0], entry[1], key)
+
+    def _band_keys(self, fingerprint):
+        mask = (1 << self.band_bits) - 1
+        return [(fingerprint >> (i * self.band_bits)) & mask for i in range(self.bands)]
+
+    def _near_duplicate(self, fingerprint):
+        for table, key in zip(self._tables, self._band_keys(fingerprint)):
+            for other in table.get(key, ()):
+                if bin(fingerprint ^ other).count("1") <= self.max_distance:
+                    return True
+        return False
+
+    def _register(self, digest, fingerprint, key=None):
+        self._hashes[digest] = self._hashes.get(digest, 0) + 1
+        for table, band in zip(self._tables, self._band_keys(fingerprint)):
+            table.setdefault(band, []).append(fingerprint)
+        if key is not None:
+            self._keys[key] = (digest, fingerprint)
+
+    def add(self, text: str, key=None) -> bool:
+        """Register a text (under key, if given); returns False if it duplicates one already seen"""
+        self.stats["seen"] += 1
+        if not normalize(text):
+            self.stats["empty"] += 1
+            return False
+
+        digest = content_hash(text)
+        if digest in self._hashes:
+            self.stats["exact"] += 1
+            return False
+
+        fingerprint = simhash(text)
+        if self.max_distance >= 0 and self._near_duplicate(fingerprint):
+            self.stats["near"] += 1
+            return False
+
+        self._register(digest, fingerprint, key)
+        self.stats["kept"] += 1
+        return True
+
+    def seed(self, texts, keys=None):
+        """Register texts already in the index (duplicates included) without counting them as new"""
+        for text, key in zip(texts, keys if keys is not None else [None] * len(texts)):
+            if normalize(text):
+                self._register(content_hash(text), simhash(text), key)
+
+    def remove(self, key):
+        """Forget the text registered under key (e.g. a deleted chunk)"""
+        entry = self._keys.pop(key, None)
+        if entry is None:
+            return
+        digest, fingerprint = entry
+        if self._hashes.get(digest, 0) > 1:
+            self._hashes[digest] -= 1
+        else:
+            self._hashes.pop(digest, None)
+        for table, band in zip(self._tables, self._band_keys(fingerprint)):
+            bucket = table.get(band)
+            if bucket and fingerprint in bucket:
+                bucket.remove(fingerprint)
+                if not bucket:
+                    del table[band]
+
+
+def dedupe_chunks(chunks, existing=(), max_distance: int = DEFAULT_MAX_DISTANCE):
+    """
+    Filter chunks before embedding.
+
+    Args:
+        chunks: New chunk texts
+        existing: Texts already in the index (duplicates of these are dropped too)
+        max_distance: SimHash bit distance treated as a near duplicate (-1 = exact only)
+
+    Returns:
+        (kept indices, stats dict)
+    """
+    deduplicator = Deduplicator(max_distance)
+    deduplicator.seed(list(existing))
+    kept = [i for i, chunk in enumerate(chunks) if deduplicator.add(chunk)]
+    return kept, deduplicator.stats
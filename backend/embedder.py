@@ -1,27 +1,317 @@
-from langchain.embeddings import HuggingFaceEmbeddings
-from langchain.vectorstores import FAISS
-import os
-from config import FAISS_INDEX_PATH
-
-def embed_and_store(chunks, index_path=FAISS_INDEX_PATH):
-    embeddings = HuggingFaceEmbeddings(model_name="BAAI/bge-small-en-v1.5")
-    
-    if os.path.exists(index_path):
-        vectorstore = FAISS.load_local(index_path, embeddings, allow_dangerous_deserialization=True)
-    else:
-        vectorstore = FAISS.from_texts(texts=[""], embedding=embeddings)
-    
-    if chunks:
-        vectorstore.add_texts(chunks)
-        vectorstore.save_local(index_path)
+import copy
+import itertools
+import threading
+import uuid
+from config import FAISS_INDEX_PATH, DEDUP_ENABLED, DEDUP_MAX_DISTANCE, INGEST_BATCH_SIZE
+from vectorstore import get_embeddings, has_index, load_vectorstore, load_collections, remember_vectorstore, save_vectorstore, collection_path
+from dedup import Deduplicator
+from metrics import Counter
+from profiling import profiled
+
+INGESTED_CHUNKS = Counter(
+    "rag_ingested_chunks_total",
+    "Chunks offered for embedding, by dedup outcome",
+    labelnames=("outcome",)
+)
+
+# Serializes writers (add, delete, save). Writers never modify a store that
+# readers may be searching: they change a private copy and swap it in.
+_write_lock = threading.RLock()
+# Index paths changed in memory but not yet saved
+_dirty = set()
+
+def source_ids(vectorstore):
+    """
+    Chunk ids per source document ({source: [ids]}), built once from the
+    docstore metadata and kept up to date by embed_and_store/delete_source.
+    """
+    ids = getattr(vectorstore, "_source_ids", None)
+    if ids is None:
+        ids = {}
+        for doc_id in vectorstore.index_to_docstore_id.values():
+            doc = vectorstore.docstore._dict.get(doc_id)
+            source = (doc.metadata or {}).get("source") if doc is not None else None
+            if source:
+                ids.setdefault(source, []).append(doc_id)
+        vectorstore._source_ids = ids
+    return ids
+
+def chunk_fingerprints(vectorstore):
+    """
+    Dedup fingerprints of the chunks in a shard, keyed by chunk id. Built once
+    from the docstore and kept up to date by embed_and_store/delete_source, so
+    new chunks are checked without re-hashing everything already indexed.
+    """
+    deduplicator = getattr(vectorstore, "_fingerprints", None)
+    if deduplicator is None:
+        deduplicator = Deduplicator(DEDUP_MAX_DISTANCE)
+        ids = list(vectorstore.index_to_docstore_id.values())
+        docs = [vectorstore.docstore._dict.get(doc_id) for doc_id in ids]
+        deduplicator.seed([doc.page_content if doc is not None else "" for doc in docs], ids)
+        vectorstore._fingerprints = deduplicator
+    return deduplicator
+
+def _source_deduplicator(vectorstore, source=None):
+    """
+    Deduplicator for new chunks of one source: it holds only that source's
+    chunks already in the shard. Chunks are never dropped because another
+    document has them, since deleting that document would lose them too.
+    """
+    if vectorstore is None or not source:
+        return Deduplicator(DEDUP_MAX_DISTANCE)
+    return chunk_fingerprints(vectorstore).subset(source_ids(vectorstore).get(source, []))
+
+_OUTCOMES = ("kept", "empty", "exact", "near")
+
+def _kept_indices(chunks, deduplicator, stats, ids=None):
+    """Indices of the chunks to embed (registered with the deduplicator under ids); adds the outcomes to stats"""
+    if deduplicator is None:
+        kept = [i for i, c in enumerate(chunks) if c and c.strip()]
+        stats["kept"] += len(kept)
+        stats["empty"] += len(chunks) - len(kept)
+        return kept
+
+    before = dict(deduplicator.stats)
+    kept = [i for i, chunk in enumerate(chunks) if deduplicator.add(chunk, ids[i] if ids else None)]
+    for outcome in _OUTCOMES:
+        stats[outcome] += deduplicator.stats[outcome] - before[outcome]
+    return kept
+
+def _report(stats):
+    for outcome in _OUTCOMES:
+        INGESTED_CHUNKS.inc(stats[outcome], outcome=outcome)
+    if DEDUP_ENABLED:
+        print(f"Dedup: kept {stats['kept']} of {sum(stats.values())} chunks "
+              f"({stats['exact']} exact, {stats['near']} near duplicates, {stats['empty']} empty)")
+
+def kept_chunk_indices(chunks, vectorstore=None, source=None):
+    """Indices of the chunks that survive dropping empty, duplicate and near-duplicate ones"""
+    stats = dict.fromkeys(_OUTCOMES, 0)
+    kept = _kept_indices(chunks, _source_deduplicator(vectorstore, source) if DEDUP_ENABLED else None, stats)
+    _report(stats)
+    return kept
+
+def filter_chunks(chunks, vectorstore=None, source=None):
+    """Drop empty, duplicate and near-duplicate chunks (including ones source already has in the index)"""
+    return [chunks[i] for i in kept_chunk_indices(chunks, vectorstore, source)]
+
+def _copy_store(vectorstore, fingerprints=None):
+    """
+    Copy of a store (FAISS index, docstore, id map and per-source ids) that
+    can be changed while searches keep using the original; publish it with
+    remember_vectorstore. fingerprints replaces the copied dedup fingerprints.
+    """
+    import faiss
+
+    clone = copy.copy(vectorstore)
+    clone.index = faiss.clone_index(vectorstore.index)
+    clone.docstore = type(vectorstore.docstore)(dict(vectorstore.docstore._dict))
+    clone.index_to_docstore_id = dict(vectorstore.index_to_docstore_id)
+    clone._source_ids = {source: list(ids) for source, ids in source_ids(vectorstore).items()}
+    if fingerprints is None and getattr(vectorstore, "_fingerprints", None) is not None:
+        fingerprints = vectorstore._fingerprints.copy()
+    if fingerprints is not None:
+        clone._fingerprints = fingerprints
+    return clone
+
+def _resolve_path(index_path, collection):
+    if index_path:
+        return index_path
+    return collection_path(collection) if collection else FAISS_INDEX_PATH
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _remove_source(vectorstore, source):
+    """Drop a source's chunks (vectors, docstore entries, fingerprints) from a private copy; returns their ids"""
+    ids = source_ids(vectorstore).pop(source, [])
+    if ids:
+        vectorstore.delete(ids)
+        deduplicator = getattr(vectorstore, "_fingerprints", None)
+        if deduplicator is not None:
+            for doc_id in ids:
+                deduplicator.remove(doc_id)
+    return ids
+
+@profiled("embed_and_store")
+def _store_pairs(pairs, index_path, source=None, batch_size=INGEST_BATCH_SIZE, replace=False):
+    """
+    Embed (text, metadata) pairs into one shard, batch_size at a time.
+
+    The pairs are consumed lazily and go into a private copy of the shard
+    (see _copy_store), which is saved and swapped in once at the end. With
+    replace, source's existing chunks are removed from that same copy, so
+    searches see the old version until the new one is complete.
+    """
+    from langchain.vectorstores import FAISS
+
+    embeddings = get_embeddings()
+    stats = dict.fromkeys(_OUTCOMES, 0)
+    with _write_lock:
+        current = load_vectorstore(index_path) if has_index(index_path) else None
+        deduplicator = fingerprints = None
+        if DEDUP_ENABLED:
+            # Fingerprints of the whole shard, kept for later uploads of each source
+            fingerprints = chunk_fingerprints(current).copy() if current is not None else Deduplicator(DEDUP_MAX_DISTANCE)
+        # Created with the first batch that has anything new to add
+        vectorstore = None
+        if replace and source and current is not None and source in source_ids(current):
+            vectorstore = _copy_store(current, fingerprints)
+            removed = _remove_source(vectorstore, source)
+            print(f"Replacing {len(removed)} chunks of the previous version of {source}")
+        if DEDUP_ENABLED:
+            deduplicator = _source_deduplicator(vectorstore or current, source)
+
+        for batch in _batches(pairs, max(1, batch_size)):
+            texts = [text for text, _ in batch]
+            ids = [str(uuid.uuid4()) for _ in batch]
+            kept = _kept_indices(texts, deduplicator, stats, ids)
+            if not kept:
+                continue
+            texts = [texts[i] for i in kept]
+            ids = [ids[i] for i in kept]
+            metadatas = [{**(batch[i][1] or {}), "source": source} if source else dict(batch[i][1] or {}) for i in kept]
+            if fingerprints is not None:
+                fingerprints.merge(deduplicator, ids)
+
+            if vectorstore is None and current is None:
+                vectorstore = FAISS.from_texts(texts=texts, embedding=embeddings, metadatas=metadatas, ids=ids)
+                # Built from the metadata, so it already includes this batch
+                source_ids(vectorstore)
+                continue
+            if vectorstore is None:
+                # The fingerprints already hold the new chunks, so they go with the copy
+                vectorstore = _copy_store(current, fingerprints)
+            vectorstore.add_texts(texts, metadatas=metadatas, ids=ids)
+            if source:
+                source_ids(vectorstore).setdefault(source, []).extend(ids)
+        _report(stats)
+
+        if vectorstore is None:
+            if current is None:
+                # Nothing to index yet; keep an empty placeholder so loads succeed
+                current = FAISS.from_texts(texts=[""], embedding=embeddings)
+            return current
+
+        if fingerprints is not None:
+            vectorstore._fingerprints = fingerprints
+        save_vectorstore(vectorstore, index_path)
+        _dirty.discard(index_path)
+    return vectorstore
+
+def embed_and_store(chunks, index_path=None, source=None, collection=None, metadatas=None):
+    """
+    Embed chunks and append them to one index shard.
+
+    Args:
+        chunks: Chunk texts
+        index_path: FAISS index directory (overrides collection)
+        source: Source document name (e.g. the PDF file name) recorded on each chunk
+            so the document can later be deleted or replaced on its own
+        collection: Collection (shard) to add to; only that shard is rewritten
+        metadatas: Optional per-chunk metadata (e.g. page/section), aligned with chunks
+    """
+    chunks = chunks or []
+    pairs = zip(chunks, metadatas) if metadatas else ((chunk, None) for chunk in chunks)
+    return _store_pairs(pairs, _resolve_path(index_path, collection), source=source)
+
+@profiled("embed_pdf")
+def embed_pdf(pdf, source, collection=None, index_path=None, replace=False):
+    """
+    Chunk a PDF page by page (chunker.iter_pdf_chunks) and embed it
+    INGEST_BATCH_SIZE chunks at a time, so only one page of text and one
+    batch of chunks and embeddings are in flight however long the PDF is.
+
+    Args:
+        pdf: Path or binary stream
+        source: Source document name recorded on each chunk
+        collection: Collection (shard) to add to
+        index_path: FAISS index directory (overrides collection)
+        replace: Remove the chunks of an earlier version of source; the
+            old version stays searchable until the new one is saved, and is
+            kept if the new file has no extractable text
+
+    Returns:
+        The updated store, or None if the PDF has no extractable text
+    """
+    from chunker import iter_pdf_chunks
+
+    pairs = iter_pdf_chunks(pdf)
+    first = next(pairs, None)
+    if first is None:
+        return None
+    index_path = _resolve_path(index_path, collection)
+    with _write_lock:
+        vectorstore = _store_pairs(itertools.chain([first], pairs), index_path, source=source, replace=replace)
+        if replace:
+            # A previous version in another collection goes once the new one is saved
+            for name, other in load_collections().items():
+                if collection_path(name) != index_path and source in source_ids(other):
+                    delete_source(source, name)
     return vectorstore
 
-def initialize_vectorstore(chunks):
-    embeddings = HuggingFaceEmbeddings(model_name="BAAI/bge-small-en-v1.5")
-    if not os.path.exists(FAISS_INDEX_PATH):
-        FAISS.from_texts(texts=[""], embedding=embeddings).save_local(FAISS_INDEX_PATH)
-    vectorstore = FAISS.load_local(FAISS_INDEX_PATH, embeddings, allow_dangerous_deserialization=True)
-    if chunks:
-        vectorstore.add_texts(chunks)
-        vectorstore.save_local(FAISS_INDEX_PATH)
-    return vectorstore
\ No newline at end of file
+def find_source(source):
+    """Name of the collection holding a source document, or None"""
+    for name, vectorstore in load_collections().items():
+        if source in source_ids(vectorstore):
+            return name
+    return None
+
+def delete_source(source, collection=None, persist=True):
+    """
+    Remove every chunk of one source document from its collection.
+
+    The vectors are dropped with FAISS remove_ids on a copy of the shard,
+    which then replaces the loaded one, so nothing else is re-embedded and
+    only that shard is rewritten. With persist=False the caller is
+    responsible for calling persist_vectorstore.
+
+    Args:
+        source: Source document name
+        collection: Collection to delete from (default: whichever holds the source)
+        persist: Save the shard to disk immediately
+
+    Returns:
+        Number of chunks removed
+    """
+    with _write_lock:
+        collection = collection or find_source(source)
+        if collection is None:
+            return 0
+        index_path = collection_path(collection)
+        if not has_index(index_path):
+            return 0
+        vectorstore = load_vectorstore(index_path)
+        ids = source_ids(vectorstore).get(source, [])
+        if ids:
+            vectorstore = _copy_store(vectorstore)
+            _remove_source(vectorstore, source)
+            # Swap the copy in (this also bumps the index version); it is saved below or by persist_vectorstore
+            remember_vectorstore(vectorstore, index_path)
+            _dirty.add(index_path)
+            if persist:
+                persist_vectorstore(index_path)
+    return len(ids)
+
+def persist_vectorstore(index_path=None):
+    """Write in-memory changes to disk (one shard, or every shard changed by delete_source(persist=False))"""
+    with _write_lock:
+        paths = [index_path] if index_path else list(_dirty)
+        for path in paths:
+            vectorstore = load_vectorstore(path)
+            save_vectorstore(vectorstore, path)
+            _dirty.discard(path)
+
+def initialize_vectorstore(chunks, source=None, collection=None):
+    index_path = _resolve_path(None, collection)
+    vectorstore = embed_and_store(chunks, index_path, source=source)
+    if not has_index(index_path):
+        save_vectorstore(vectorstore, index_path)
+    return vectorstore
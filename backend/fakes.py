@@ -0,0 +1,348 @@
+# fakes.py
+"""
+Local stand-ins for Groq, Supabase, Redis and the website, used by the
+benchmark and load-test tools so they run without network services.
+
+install_fakes() must be called before importing main / llm_agent.
+"""
+import fnmatch
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import types
+from datetime import datetime
+from urllib.parse import urlparse
+
+
+# === Supabase ===
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+    def __init__(self, table, latency):
+        self._table = table
+        self._latency = latency
+        self._op = "select"
+        self._columns = None
+        self._payload = None
+        self._filters = []
+        self._order = None
+        self._limit = None
+
+    def select(self, columns="*"):
+        self._op = "select"
+        if columns.strip() != "*":
+            # "users:email(name)" style embeds are returned as empty objects
+            self._columns = [c.strip() for c in columns.split(",")]
+        return self
+
+    def insert(self, payload):
+        self._op = "insert"
+        self._payload = payload if isinstance(payload, list) else [payload]
+        return self
+
+    def update(self, values):
+        self._op = "update"
+        self._payload = values
+        return self
+
+    def delete(self):
+        self._op = "delete"
+        return self
+
+    def eq(self, column, value):
+        self._filters.append((column, value))
+        return self
+
+    def order(self, column, desc=False):
+        self._order = (column, desc)
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def _matches(self, row):
+        return all(str(row.get(c)) == str(v) for c, v in self._filters)
+
+    def _project(self, row):
+        if self._columns is None:
+            return dict(row)
+        out = {}
+        for column in self._columns:
+            if ":" in column or "(" in column:
+                out[column.split(":")[0]] = {}
+            else:
+                out[column] = row.get(column)
+        return out
+
+    def execute(self):
+        if self._latency:
+            time.sleep(self._latency)
+        table = self._table
+        with table.lock:
+            if self._op == "insert":
+                inserted = []
+                for row in self._payload:
+                    row = dict(row)
+                    now = datetime.utcnow().isoformat()
+                    row.setdefault("id", next(table.ids))
+                    row.setdefault("created_at", now)
+                    row.setdefault("updated_at", now)
+                    if table.unique and any(r.get(table.unique) == row.get(table.unique) for r in table.rows):
+                        raise ValueError(f"duplicate key value violates unique constraint on {table.unique}")
+                    table.rows.append(row)
+                    inserted.append(dict(row))
+                return _Result(inserted)
+
+            rows = [r for r in table.rows if self._matches(r)]
+            if self._op == "update":
+                values = {k: (datetime.utcnow().isoformat() if v == "now()" else v) for k, v in self._payload.items()}
+                for row in rows:
+                    row.update(values)
+                return _Result([dict(r) for r in rows])
+            if self._op == "delete":
+                table.rows = [r for r in table.rows if not self._matches(r)]
+                return _Result([dict(r) for r in rows])
+
+            if self._order:
+                column, desc = self._order
+                rows.sort(key=lambda r: str(r.get(column, "")), reverse=desc)
+            if self._limit is not None:
+                rows = rows[:self._limit]
+            return _Result([self._project(r) for r in rows])
+
+
+class _Table:
+    def __init__(self, unique=None):
+        self.rows = []
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.unique = unique
+
+
+class FakeSupabase:
+    """In-memory subset of the supabase-py query builder used by this app"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self._tables = {"users": _Table(unique="email")}
+        self._lock = threading.Lock()
+
+    def table(self, name):
+        with self._lock:
+            table = self._tables.setdefault(name, _Table())
+        return _Query(table, self.latency)
+
+
+# === Groq ===
+def make_fake_groq(latency=0.0, answer="This is a benchmark answer based on the provided context."):
+    """Build a Groq-compatible class whose completions sleep for `latency` seconds"""
+
+    class _Completions:
+        def create(self, model=None, messages=None, **kwargs):
+            if latency:
+                time.sleep(latency)
+            message = types.SimpleNamespace(content=answer)
+            return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], model=model)
+
+    class FakeGroq:
+        def __init__(self, api_key=None, **kwargs):
+            self.chat = types.SimpleNamespace(completions=_Completions())
+
+    return FakeGroq
+
+
+# === Redis ===
+class FakeRedis:
+    """Dict-backed subset of redis-py (str/bytes values, expiry in seconds)"""
+
+    def __init__(self):
+        self._data = {}
+        self._expiry = {}
+        self._lock = threading.Lock()
+
+    def _alive(self, key):
+        expires_at = self._expiry.get(key)
+        if expires_at is not None and expires_at <= time.time():
+            self._data.pop(key, None)
+            self._expiry.pop(key, None)
+        return key in self._data
+
+    def ping(self):
+        return True
+
+    def get(self, key):
+        with self._lock:
+            return self._data.get(key) if self._alive(key) else None
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = value
+            if ex:
+                self._expiry[key] = time.time() + ex
+            else:
+                self._expiry.pop(key, None)
+        return True
+
+    def setex(self, key, seconds, value):
+        return self.set(key, value, ex=seconds)
+
+    def delete(self, *keys):
+        removed = 0
+        with self._lock:
+            for key in keys:
+                if self._alive(key):
+                    removed += 1
+                self._data.pop(key, None)
+                self._expiry.pop(key, None)
+        return removed
+
+    def unlink(self, *keys):
+        return self.delete(*keys)
+
+    def keys(self, pattern="*"):
+        with self._lock:
+            return [k for k in list(self._data) if self._alive(k) and fnmatch.fnmatchcase(k, pattern)]
+
+    def scan_iter(self, match="*", count=None):
+        yield from self.keys(match)
+
+    def strlen(self, key):
+        value = self.get(key)
+        return 0 if value is None else len(value)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def ttl(self, key):
+        with self._lock:
+            if not self._alive(key):
+                return -2
+            expires_at = self._expiry.get(key)
+            return -1 if expires_at is None else int(expires_at - time.time())
+
+
+class FakePipeline:
+    """Queues FakeRedis calls and runs them on execute()"""
+
+    def __init__(self, client):
+        self._client = client
+        self._calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+
+        def queue(*args, **kwargs):
+            self._calls.append((method, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        calls, self._calls = self._calls, []
+        return [method(*args, **kwargs) for method, args, kwargs in calls]
+
+
+# === Website snapshot ===
+class SnapshotSite:
+    """
+    Serve recorded pages instead of the live site.
+
+    A snapshot directory holds the saved HTML files plus an index.json
+    mapping each URL to its file name (see record_snapshot).
+    """
+
+    class RequestException(Exception):
+        pass
+
+    class HTTPError(RequestException):
+        pass
+
+    def __init__(self, snapshot_dir, latency=0.0):
+        self.snapshot_dir = snapshot_dir
+        self.latency = latency
+        index_path = os.path.join(snapshot_dir, "index.json")
+        with open(index_path) as f:
+            self.pages = json.load(f)
+
+    def urls(self):
+        return list(self.pages)
+
+    def get(self, url, headers=None, timeout=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        filename = self.pages.get(url) or self.pages.get(url.rstrip("/"))
+        if filename is None:
+            return _SnapshotResponse(404, b"")
+        with open(os.path.join(self.snapshot_dir, filename), "rb") as f:
+            return _SnapshotResponse(200, f.read())
+
+
+class _SnapshotResponse:
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+        self.text = content.decode("utf-8", errors="replace")
+        # Snapshots keep only the body; decode it as UTF-8 like .text does
+        self.headers = {}
+        self.encoding = None
+        self.apparent_encoding = "utf-8"
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise SnapshotSite.HTTPError(f"{self.status_code} from snapshot")
+
+
+def record_snapshot(urls, snapshot_dir):
+    """Save the given pages with requests so later runs are reproducible"""
+    import requests
+
+    os.makedirs(snapshot_dir, exist_ok=True)
+    pages = {}
+    for i, url in enumerate(urls):
+        response = requests.get(url, timeout=15)
+        response.raise_for_status()
+        filename = f"{i:04d}_{urlparse(url).netloc}.html"
+        with open(os.path.join(snapshot_dir, filename), "wb") as f:
+            f.write(response.content)
+        pages[url] = filename
+    with open(os.path.join(snapshot_dir, "index.json"), "w") as f:
+        json.dump(pages, f, indent=2)
+    return pages
+
+
+# === Wiring ===
+def install_fakes(groq_latency=0.0, supabase_latency=0.0, snapshot_dir=None, site_latency=0.0):
+    """
+    Replace external services with local fakes.
+
+    Call before importing main / llm_agent so module-level clients pick up
+    the fakes. Returns a namespace with the fake instances.
+    """
+    os.environ.setdefault("GROQ_API_KEY", "fake-groq-key")
+
+    supabase = FakeSupabase(latency=supabase_latency)
+    supabase_module = types.ModuleType("supabase_client")
+    supabase_module.supabase = supabase
+    supabase_module.supabase_admin = supabase
+    sys.modules["supabase_client"] = supabase_module
+
+    fake_groq = make_fake_groq(latency=groq_latency)
+    redis_fake = FakeRedis()
+    site = SnapshotSite(snapshot_dir, latency=site_latency) if snapshot_dir else None
+
+    import llm_agent
+    import realtime_scraper
+    import scrape_cache
+
+    llm_agent.Groq = fake_groq
+    scrape_cache.redis_client = redis_fake
+    if site is not None:
+        realtime_scraper.requests = site
+
+    return types.SimpleNamespace(supabase=supabase, groq=fake_groq, redis=redis_fake, site=site)
@@ -1,34 +1,151 @@
+import json
+import re
+import threading
+
+from config import GUARDRAIL_PATTERNS_FILE, GUARDRAIL_CLASSIFIER_ENABLED, GUARDRAIL_CLASSIFIER_THRESHOLD
+
+BLOCKED_MESSAGE = (
+    "I cannot provide assistance with that request. "
+    "If you have questions about academic integrity, ethics, or safety, "
+    "please consult with your instructor or appropriate authority."
+)
+
+# Patterns that indicate harmful intent (not just mentioning the topic)
+DEFAULT_HARMFUL_PATTERNS = [
+    "how to make a bomb",
+    "how to hack",
+    "how to cheat on exam",
+    "exam answers",
+    "steal",
+    "how to plagiarize",
+    "help me cheat",
+    "give me exam leak",
+    "how to commit fraud",
+    "how to discriminate",
+    "ways to hurt",
+    "how to kill"
+]
+
+_lock = threading.Lock()
+_matcher = None
+_exemplars = None
+
+
+def load_patterns(path=None):
+    """Read guardrail patterns from a file, falling back to the built-in list"""
+    path = path or GUARDRAIL_PATTERNS_FILE
+    if not path:
+        return list(DEFAULT_HARMFUL_PATTERNS)
+    with open(path) as f:
+        if path.endswith(".json"):
+            patterns = json.load(f)
+        else:
+            patterns = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    return patterns
+
+
+def compile_patterns(patterns):
+    """
+    Compile every pattern into one case-insensitive alternation so a query
+    is scanned once instead of once per pattern.
+    """
+    parts = []
+    for pattern in patterns:
+        if pattern.startswith("re:"):
+            parts.append(f"(?:{pattern[3:]})")
+        else:
+            parts.append(re.escape(pattern.lower()))
+    if not parts:
+        return None
+    # Longest literals first so overlapping patterns report the most specific match
+    parts.sort(key=len, reverse=True)
+    return re.compile("|".join(parts), re.IGNORECASE)
+
+
+def get_matcher():
+    global _matcher
+    if _matcher is None:
+        with _lock:
+            if _matcher is None:
+                _matcher = {"patterns": load_patterns()}
+                _matcher["regex"] = compile_patterns(_matcher["patterns"])
+    return _matcher
+
+
+def reload_patterns(path=None):
+    """Recompile the matcher (e.g. after editing the patterns file)"""
+    global _matcher, _exemplars
+    patterns = load_patterns(path)
+    with _lock:
+        _matcher = {"patterns": patterns, "regex": compile_patterns(patterns)}
+        _exemplars = None
+    return len(patterns)
+
+
+def match_pattern(text):
+    """Return the first harmful pattern found in the text, or None"""
+    regex = get_matcher()["regex"]
+    if regex is None or not text:
+        return None
+    found = regex.search(text)
+    return found.group(0) if found else None
+
+
+def _get_exemplars():
+    """Embed the literal patterns once for the classifier stage"""
+    global _exemplars
+    if _exemplars is None:
+        import numpy as np
+        import retriever
+
+        phrases = [p for p in get_matcher()["patterns"] if not p.startswith("re:")]
+        vectors = np.array(retriever.embed_documents(phrases), dtype="float32")
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+        _exemplars = vectors
+    return _exemplars
+
+
+def classify_query(query):
+    """Highest cosine similarity between the query and the harmful exemplars"""
+    import numpy as np
+    import retriever
+
+    exemplars = _get_exemplars()
+    if not len(exemplars):
+        return 0.0
+    vector = np.array(retriever.embed_query(query), dtype="float32")
+    vector /= np.linalg.norm(vector) + 1e-12
+    return float(np.max(exemplars @ vector))
+
+
+def check_query(query):
+    """
+    Check a query before any retrieval or LLM work.
+
+    Returns:
+        The refusal message if the query should be blocked, otherwise None
+    """
+    if match_pattern(query):
+        return BLOCKED_MESSAGE
+
+    if GUARDRAIL_CLASSIFIER_ENABLED:
+        try:
+            if classify_query(query) >= GUARDRAIL_CLASSIFIER_THRESHOLD:
+                return BLOCKED_MESSAGE
+        except Exception as e:
+            print(f"Guardrail classifier error: {e}")
+
+    return None
+
+
 def apply_guardrails(query, response):
     """
     Apply guardrails to filter harmful content while allowing legitimate academic discussions.
     Only blocks queries that are clearly requesting harmful actions, not educational content.
     """
-    
-    # Patterns that indicate harmful intent (not just mentioning the topic)
-    harmful_patterns = [
-        "how to make a bomb",
-        "how to hack",
-        "how to cheat on exam",
-        "exam answers",
-        "steal",
-        "how to plagiarize",
-        "help me cheat",
-        "give me exam leak",
-        "how to commit fraud",
-        "how to discriminate",
-        "ways to hurt",
-        "how to kill"
-    ]
-    
-    query_lower = query.lower()
-    
     # Check if query is requesting harmful actions (not just mentioning topics)
-    if any(pattern in query_lower for pattern in harmful_patterns):
-        return (
-            "I cannot provide assistance with that request. "
-            "If you have questions about academic integrity, ethics, or safety, "
-            "please consult with your instructor or appropriate authority."
-        )
-    
+    if match_pattern(query):
+        return BLOCKED_MESSAGE
+
     # Allow the response through - the LLM system prompt already handles ethical responses
-    return response
\ No newline at end of file
+    return response
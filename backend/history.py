@@ -0,0 +1,109 @@
+import threading
+from config import HISTORY_MAX_TURNS, HISTORY_TOKEN_BUDGET, HISTORY_CACHE_SIZE, HISTORY_CACHE_TTL
+from ttl_cache import TTLCache
+
+# session_id -> {"summary": str, "turns": [...], "pending": [...]}
+_windows = TTLCache(maxsize=HISTORY_CACHE_SIZE, ttl=HISTORY_CACHE_TTL)
+_lock = threading.Lock()
+
+# Older messages beyond this many are never loaded, so a cold summary stays cheap
+LOAD_LIMIT = HISTORY_MAX_TURNS * 3
+# Evicted turns kept for a retry while the summarizer keeps failing
+PENDING_LIMIT = HISTORY_MAX_TURNS * 2
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+def _clip(content: str) -> str:
+    """Keep a single turn from eating the whole budget"""
+    max_chars = HISTORY_TOKEN_BUDGET * 2
+    if len(content) > max_chars:
+        return content[:max_chars] + "..."
+    return content
+
+
+def _trim(window):
+    """Move the oldest turns to the pending list until the window fits the turn and token limits"""
+    turns = window["turns"]
+    while turns and (
+        len(turns) > HISTORY_MAX_TURNS
+        or (len(turns) > 1 and sum(estimate_tokens(t["content"]) for t in turns) > HISTORY_TOKEN_BUDGET)
+    ):
+        window["pending"].append(turns.pop(0))
+
+
+def get_window(session_id, loader, summarizer=None):
+    """
+    Get the compact conversation window for a session.
+
+    Args:
+        session_id: Chat session id
+        loader: Callable(session_id, limit) returning the latest messages, oldest first
+        summarizer: Optional callable(previous_summary, turns) folding evicted turns into a summary
+
+    Returns:
+        Dict with the running "summary" and the most recent "turns"
+    """
+    with _lock:
+        window = _windows.get(session_id)
+    if window is None:
+        messages = loader(session_id, LOAD_LIMIT)
+        window = {
+            "summary": "",
+            "turns": [{"role": m["role"], "content": _clip(m["content"])} for m in messages],
+            "pending": []
+        }
+        with _lock:
+            _windows.set(session_id, window)
+
+    with _lock:
+        _trim(window)
+        pending = window["pending"]
+        window["pending"] = []
+        summary = window["summary"]
+
+    unsummarized = []
+    if pending and summarizer:
+        try:
+            summary = summarizer(summary, pending)
+            with _lock:
+                window["summary"] = summary
+        except Exception as e:
+            print(f"Error summarizing history: {e}")
+            # Retry folding them in on the next call (keeping only the newest PENDING_LIMIT),
+            # and meanwhile pass on as many verbatim as still fit the token budget
+            unsummarized = pending
+            with _lock:
+                window["pending"] = (pending + window["pending"])[-PENDING_LIMIT:]
+
+    with _lock:
+        turns = list(window["turns"])
+    room = HISTORY_TOKEN_BUDGET - sum(estimate_tokens(t["content"]) for t in turns)
+    kept = []
+    for turn in reversed(unsummarized):
+        room -= estimate_tokens(turn["content"])
+        if room < 0:
+            break
+        kept.insert(0, turn)
+    return {"summary": window["summary"], "turns": kept + turns}
+
+
+def append_turn(session_id, role: str, content: str):
+    """Record a new turn in the cached window (no-op if the session isn't cached yet)"""
+    with _lock:
+        window = _windows.get(session_id)
+        if window is not None:
+            window["turns"].append({"role": role, "content": _clip(content)})
+            _trim(window)
+
+
+def forget(session_id=None):
+    """Drop the cached window for one session, or all sessions"""
+    with _lock:
+        if session_id is None:
+            _windows.clear()
+        else:
+            _windows.pop(session_id)
@@ -0,0 +1,165 @@
+# html_extract.py
+"""
+Single-pass HTML text extraction shared by the crawler and the real-time scraper.
+
+The page is parsed once with lxml and walked once; text is emitted as
+structured blocks (headings, paragraphs, list items, table rows) instead
+of calling get_text() on every nested element.
+"""
+import re
+from urllib.parse import urljoin
+from lxml import etree, html as lxml_html
+
+SKIP_TAGS = {"head", "script", "style", "noscript", "header", "footer", "nav", "template", "svg", "iframe"}
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+LIST_TAGS = {"li", "dt", "dd"}
+CELL_TAGS = {"td", "th"}
+BLOCK_TAGS = HEADING_TAGS | LIST_TAGS | {
+    "p", "div", "section", "article", "main", "aside", "blockquote", "pre", "figure", "figcaption",
+    "ul", "ol", "dl", "table", "thead", "tbody", "tfoot", "tr", "caption", "address", "body"
+}
+
+_CELL_BREAK = "\x1f"
+_WHITESPACE = re.compile(r"\s+")
+
+
+def parse_html(markup, encoding=None):
+    """
+    Parse bytes or str into an lxml element tree root.
+
+    Args:
+        markup: HTML (str is already decoded, e.g. Selenium's page_source)
+        encoding: Charset of bytes input (e.g. from the HTTP response); without
+            it lxml goes by <meta charset> and otherwise assumes Latin-1
+    """
+    if isinstance(markup, etree._Element):
+        return markup
+    if isinstance(markup, str):
+        # Re-encoded with a matching parser so an XML encoding declaration or a
+        # stale <meta charset> can't make lxml decode the text a second time
+        markup, encoding = markup.encode("utf-8"), "utf-8"
+    if not markup or not markup.strip():
+        return lxml_html.fromstring("<html></html>")
+    if encoding:
+        return lxml_html.fromstring(markup, parser=lxml_html.HTMLParser(encoding=encoding))
+    return lxml_html.fromstring(markup)
+
+
+def _block_type(tag):
+    if tag in HEADING_TAGS:
+        return "heading"
+    if tag in LIST_TAGS:
+        return "list_item"
+    if tag == "tr":
+        return "table_row"
+    return "paragraph"
+
+
+def iter_blocks(markup, min_length=0, encoding=None):
+    """
+    Walk the DOM once and yield text blocks in document order.
+
+    Args:
+        markup: HTML bytes/str or an already parsed lxml root
+        min_length: Skip blocks shorter than this many characters
+        encoding: Charset of bytes input (see parse_html)
+
+    Yields:
+        Dicts with "type" (heading, paragraph, list_item, table_row), "text",
+        and "level" for headings
+    """
+    root = parse_html(markup, encoding)
+    buffer = []
+    open_blocks = []
+
+    def flush():
+        if not buffer:
+            return None
+        raw = "".join(buffer)
+        buffer.clear()
+        tag = open_blocks[-1] if open_blocks else "p"
+        block_type = _block_type(tag)
+        if block_type == "table_row":
+            cells = [_WHITESPACE.sub(" ", c).strip() for c in raw.split(_CELL_BREAK)]
+            text = " | ".join(c for c in cells if c)
+        else:
+            text = _WHITESPACE.sub(" ", raw.replace(_CELL_BREAK, " ")).strip()
+        if not text or len(text) < min_length:
+            return None
+        block = {"type": block_type, "text": text}
+        if block_type == "heading":
+            block["level"] = int(tag[1])
+        return block
+
+    # Iterative walk: a stack of child iterators, with the matching open elements in `parents`
+    parents = []
+    stack = [iter((root,))]
+    while stack:
+        element = next(stack[-1], None)
+
+        if element is None:
+            # All children done: close the parent element
+            stack.pop()
+            if not parents:
+                continue
+            element = parents.pop()
+            tag = element.tag.lower()
+            if tag in BLOCK_TAGS:
+                block = flush()
+                if block:
+                    yield block
+                open_blocks.pop()
+            elif tag in CELL_TAGS:
+                buffer.append(_CELL_BREAK)
+            if element.tail:
+                buffer.append(element.tail)
+            continue
+
+        tag = element.tag.lower() if isinstance(element.tag, str) else None
+        if tag is None or tag in SKIP_TAGS:
+            # Comments and skipped subtrees: only the trailing text is content
+            if element.tail:
+                buffer.append(element.tail)
+            continue
+
+        if tag in BLOCK_TAGS:
+            block = flush()
+            if block:
+                yield block
+            open_blocks.append(tag)
+        elif tag == "br":
+            buffer.append(" ")
+        if element.text:
+            buffer.append(element.text)
+        parents.append(element)
+        stack.append(iter(element))
+
+    block = flush()
+    if block:
+        yield block
+
+
+def format_block(block):
+    """Render a block as a line of text, keeping light structure markers for the chunker"""
+    if block["type"] == "heading":
+        return f"{'#' * block['level']} {block['text']}"
+    if block["type"] == "list_item":
+        return f"- {block['text']}"
+    return block["text"]
+
+
+def extract_text(markup, min_length=0, encoding=None):
+    """Extract the readable text of a page, one block per line"""
+    return "\n".join(format_block(block) for block in iter_blocks(markup, min_length=min_length, encoding=encoding))
+
+
+def extract_links(markup, base_url):
+    """Absolute URLs of all <a href> links (fragments removed), in document order"""
+    root = parse_html(markup)
+    links = []
+    for anchor in root.iter("a"):
+        href = (anchor.get("href") or "").strip()
+        if not href or href.startswith(("#", "javascript:", "mailto:", "tel:")):
+            continue
+        links.append(urljoin(base_url, href).split("#")[0])
+    return links
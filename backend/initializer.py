@@ -1,23 +1,28 @@
 import os
-from pypdf import PdfReader
 from scraper import KprietScraper
-from chunker import chunk_text, preprocess_uploaded_doc
-from embedder import initialize_vectorstore
-from config import SCRAPE_LINKS, PDF_DIR
+from chunker import chunk_text
+from embedder import initialize_vectorstore, embed_pdf, find_source
+from config import SCRAPE_LINKS, PDF_DIR, WEBSITE_COLLECTION, UPLOAD_COLLECTION
+from profiling import profiled
 
-def process_pre_existing_pdfs():
-    chunks = []
+def process_pre_existing_pdfs(collection=UPLOAD_COLLECTION):
+    """Embed every PDF in PDF_DIR that isn't indexed yet, page by page; returns the file names added"""
+    added = []
     if os.path.exists(PDF_DIR):
-        for filename in os.listdir(PDF_DIR):
-            if filename.endswith(".pdf"):
+        for filename in sorted(os.listdir(PDF_DIR)):
+            if filename.endswith(".pdf") and find_source(filename) is None:
                 filepath = os.path.join(PDF_DIR, filename)
-                reader = PdfReader(filepath)
-                text = " ".join([page.extract_text() for page in reader.pages if page.extract_text()])
-                chunks.extend(preprocess_uploaded_doc(text))
-    return chunks
+                if embed_pdf(filepath, source=filename, collection=collection) is not None:
+                    added.append(filename)
+    return added
 
+@profiled("initial_vectorization")
 def initial_vectorization():
-    pdf_chunks = []
+    # Uploaded PDFs live in PDF_DIR, so a rebuilt index gets them back too
+    pdf_files = process_pre_existing_pdfs()
+    if pdf_files:
+        print(f"Indexed {len(pdf_files)} PDFs from {PDF_DIR}")
+
     if SCRAPE_LINKS:
         # Use crawler for first URL, ignore others or crawl multiple
         scraper = KprietScraper(base_url=SCRAPE_LINKS[0], max_pages=50)
@@ -26,5 +31,4 @@ def initial_vectorization():
     else:
         web_chunks = []
 
-    all_chunks = pdf_chunks + web_chunks
-    return initialize_vectorstore(all_chunks)
\ No newline at end of file
+    return initialize_vectorstore(web_chunks, source="website", collection=WEBSITE_COLLECTION)
@@ -1,54 +1,171 @@
 from groq import Groq
-from config import GROQ_API_KEY, SCRAPE_LINKS
-from vectorstore import load_vectorstore
-from guardrails import apply_guardrails
+from config import GROQ_API_KEY, SCRAPE_LINKS, RERANK_ENABLED, RERANK_CANDIDATES
+import retriever
+from guardrails import check_query, match_pattern, BLOCKED_MESSAGE
 from realtime_scraper import scrape_website
+from metrics import stage
+from reranker import rerank as rerank_docs
+from profiling import profiled
+
+SYSTEM_PROMPT = (
+    "You are a helpful and ethical assistant in an academic setting. "
+    "Base your answers strictly on the provided context. "
+    "Promote academic integrity, respectful communication, and precise language. "
+    "If the query involves rule-breaking, illegal activities, or unethical topics, "
+    "do not provide any guidance or information. Instead, respond with a piece of advice "
+    "highlighting the importance of ethics and consequences, and advise the user to consult "
+    "their mentor, teacher, or appropriate authority for proper guidance. "
+    "When a context passage is labelled with a document and page, cite it, e.g. (handbook.pdf, p. 4)."
+)
+
+# Small, fast model used for query rewriting and history summaries
+HISTORY_MODEL = "llama-3.1-8b-instant"
+
+def condense_query(query, history):
+    """Rewrite a follow-up question into a standalone search query using the recent turns"""
+    turns = history.get("turns") if history else None
+    if not turns:
+        return query
+
+    transcript = "\n".join(f"{t['role']}: {t['content']}" for t in turns)
+    if history.get("summary"):
+        transcript = f"Summary: {history['summary']}\n{transcript}"
+    try:
+        client = Groq(api_key=GROQ_API_KEY)
+        response = client.chat.completions.create(
+            model=HISTORY_MODEL,
+            messages=[
+                {
+                    "role": "system",
+                    "content": (
+                        "Rewrite the user's latest question as a single standalone search query, "
+                        "resolving references to the conversation. Reply with the query only."
+                    )
+                },
+                {"role": "user", "content": f"Conversation:\n{transcript}\n\nLatest question: {query}"}
+            ],
+            temperature=0,
+            max_tokens=64
+        )
+        rewritten = response.choices[0].message.content.strip()
+        return rewritten or query
+    except Exception as e:
+        print(f"Error condensing query: {e}")
+        last_user = next((t["content"] for t in reversed(turns) if t["role"] == "user"), "")
+        return f"{last_user} {query}".strip()
+
+def summarize_history(summary, turns):
+    """Fold evicted turns into the running conversation summary"""
+    transcript = "\n".join(f"{t['role']}: {t['content']}" for t in turns)
+    client = Groq(api_key=GROQ_API_KEY)
+    response = client.chat.completions.create(
+        model=HISTORY_MODEL,
+        messages=[
+            {
+                "role": "system",
+                "content": (
+                    "Update the running summary of a student's conversation with an academic assistant. "
+                    "Keep names, dates, courses and open questions. Reply with the summary only, under 120 words."
+                )
+            },
+            {"role": "user", "content": f"Current summary: {summary or '(none)'}\n\nNew turns:\n{transcript}"}
+        ],
+        temperature=0,
+        max_tokens=200
+    )
+    return response.choices[0].message.content.strip()
+
+@profiled("rag_query")
+def rag_query(query, use_complex_model=False, history=None, k=3, rerank=None, collections=None):
+    """
+    Answer a query with retrieved context.
+
+    Args:
+        query: The user's message
+        use_complex_model: Use the larger model for the answer
+        history: Optional conversation window from history.get_window ({"summary", "turns"})
+        k: Number of chunks to retrieve
+        rerank: Fetch RERANK_CANDIDATES chunks and rerank them down to k (defaults to RERANK_ENABLED)
+        collections: Only search these collections (default: all)
+    """
+    # Refuse harmful queries before paying for retrieval or any LLM call
+    with stage("guardrails"):
+        blocked = check_query(query)
+    if blocked:
+        return blocked
+
+    with stage("query_rewrite"):
+        search_query = condense_query(query, history)
+    if search_query != query and match_pattern(search_query):
+        return BLOCKED_MESSAGE
 
-def rag_query(query, use_complex_model=False):
     # Get context from vector store (PDFs and cached web content)
-    vectorstore = load_vectorstore()
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 3})
-    
-    docs = retriever.get_relevant_documents(query)
-    context_parts = [doc.page_content for doc in docs]
+    with stage("embed"):
+        query_embedding = retriever.embed_query(search_query)
+    rerank = RERANK_ENABLED if rerank is None else rerank
+    with stage("faiss_search"):
+        results = retriever.search(query_embedding, k=max(k, RERANK_CANDIDATES) if rerank else k, collections=collections)
+    docs = [doc for doc, _ in results]
+    if rerank:
+        with stage("rerank"):
+            docs = rerank_docs(search_query, docs, k)
+    return generate_answer(query, build_context(docs), history=history, use_complex_model=use_complex_model)
+
+def format_passage(doc):
+    """Chunk text, labelled with its document and page when known so answers can cite it"""
+    metadata = doc.metadata or {}
+    if metadata.get("page") is None:
+        return doc.page_content
+    label = f"{metadata.get('source', 'document')}, p. {metadata['page']}"
+    if metadata.get("section"):
+        label += f", {metadata['section']}"
+    return f"[{label}]\n{doc.page_content}"
+
+def build_context(docs):
+    """Context passages for the prompt: the retrieved chunks plus a snippet of the live website"""
+    context_parts = [format_passage(doc) for doc in docs]
     
     # Add real-time web scraping for fresh content
     if SCRAPE_LINKS:
         try:
             # Scrape the main page only (first URL in the list)
             main_url = SCRAPE_LINKS[0] if isinstance(SCRAPE_LINKS, list) else SCRAPE_LINKS
-            fresh_content = scrape_website(main_url, use_cache=True)
+            with stage("scrape"):
+                fresh_content = scrape_website(main_url, use_cache=True)
             if fresh_content:
                 # Add a snippet of fresh content (first 1000 chars to avoid token limits)
                 context_parts.append(f"[Fresh from website]: {fresh_content[:1000]}")
         except Exception as e:
             print(f"Error fetching real-time content: {e}")
-    
-    context = "\n\n".join(context_parts)
+    return context_parts
+
+def generate_answer(query, context_parts, history=None, use_complex_model=False):
+    """Build the prompt from context passages (and the conversation window) and call the LLM"""
+    with stage("prompt_build"):
+        context = "\n\n".join(context_parts)
+        
+        conversation = []
+        if history:
+            if history.get("summary"):
+                conversation.append({"role": "system", "content": f"Summary of the earlier conversation: {history['summary']}"})
+            conversation.extend({"role": t["role"], "content": t["content"]} for t in history.get("turns", []))
+        
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            *conversation,
+            {"role": "user", "content": f"Context: {context}\nQuery: {query}"}
+        ]
     
     # Choose model based on complexity
     model_name = "llama-3.3-70b-versatile" if not use_complex_model else "openai/gpt-oss-120b"
     client = Groq(api_key=GROQ_API_KEY)
     
-    response = client.chat.completions.create(
-        model=model_name,
-        messages=[
-            {
-                "role": "system", 
-                "content": (
-                    "You are a helpful and ethical assistant in an academic setting. "
-                    "Base your answers strictly on the provided context. "
-                    "Promote academic integrity, respectful communication, and precise language. "
-                    "If the query involves rule-breaking, illegal activities, or unethical topics, "
-                    "do not provide any guidance or information. Instead, respond with a piece of advice "
-                    "highlighting the importance of ethics and consequences, and advise the user to consult "
-                    "their mentor, teacher, or appropriate authority for proper guidance."
-                )
-            },
-            {"role": "user", "content": f"Context: {context}\nQuery: {query}"}
-        ],
-        temperature=0.3,
-        max_tokens=500
-    )
+    with stage("llm"):
+        response = client.chat.completions.create(
+            model=model_name,
+            messages=messages,
+            temperature=0.3,
+            max_tokens=500
+        )
     
-    return apply_guardrails(query, response.choices[0].message.content)
\ No newline at end of file
+    return response.choices[0].message.content
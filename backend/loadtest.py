@@ -0,0 +1,222 @@
+# loadtest.py
+"""
+Load test with simulated students against the FastAPI app.
+
+Each virtual user logs in, opens a chat session, then sends chat messages
+with think time in between and reads the session history every few
+messages. Groq and Supabase are replaced by the local fakes from fakes.py
+with configurable injected latency, so the numbers show what one box can
+sustain, not what the external services allow.
+
+Reports throughput, p50/p95/p99 latency and error rate per endpoint.
+
+Usage:
+    python loadtest.py --users 50 --chats 5 --think-time 2 --groq-latency 0.8
+    python loadtest.py --users 200 --hot-ratio 0.8 --hot-queries 2   # announcement burst
+    python loadtest.py --pdf-dir pdfs --users 20                     # with a real index
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime
+
+from benchmark import DEFAULT_QUERIES, summarize, git_commit, load_corpus
+from fakes import install_fakes
+
+PASSWORD = "loadtest-password"
+ENDPOINTS = ("login", "sessions_new", "chat", "history")
+
+
+class Recorder:
+    """Latency and status per endpoint"""
+
+    def __init__(self):
+        self.latencies = {name: [] for name in ENDPOINTS}
+        self.errors = {name: 0 for name in ENDPOINTS}
+        self.statuses = {name: {} for name in ENDPOINTS}
+
+    async def call(self, name, request):
+        start = time.perf_counter()
+        try:
+            resp = await request
+            status = resp.status_code
+        except Exception as e:
+            resp, status = None, type(e).__name__
+        self.latencies[name].append(time.perf_counter() - start)
+        self.statuses[name][str(status)] = self.statuses[name].get(str(status), 0) + 1
+        if status != 200:
+            self.errors[name] += 1
+            return None
+        return resp
+
+    def report(self, elapsed):
+        endpoints = {}
+        for name in ENDPOINTS:
+            count = len(self.latencies[name])
+            endpoints[name] = {
+                "requests_per_sec": round(count / elapsed, 2) if elapsed else None,
+                "errors": self.errors[name],
+                "error_rate": round(self.errors[name] / count, 4) if count else 0.0,
+                "statuses": self.statuses[name],
+                **summarize(self.latencies[name]),
+            }
+        return endpoints
+
+
+def pick_query(rng, queries, hot_ratio, hot_queries):
+    """Draw from the hot set with probability hot_ratio, otherwise from the whole mix"""
+    if hot_queries and rng.random() < hot_ratio:
+        return rng.choice(queries[:hot_queries])
+    return rng.choice(queries)
+
+
+async def virtual_user(client, recorder, email, args, queries, rng):
+    # Spread logins over the ramp-up period
+    await asyncio.sleep(rng.uniform(0, args.ramp_up))
+
+    resp = await recorder.call("login", client.post("/api/auth/login", json={"email": email, "password": PASSWORD}))
+    if resp is None:
+        return
+    headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+    resp = await recorder.call("sessions_new", client.post("/api/chat/sessions/new", headers=headers))
+    if resp is None:
+        return
+    session_id = resp.json()["session_id"]
+
+    for i in range(args.chats):
+        if args.think_time:
+            await asyncio.sleep(rng.expovariate(1 / args.think_time))
+        query = pick_query(rng, queries, args.hot_ratio, args.hot_queries)
+        await recorder.call("chat", client.post(f"/api/chat/{session_id}", json={"message": query}, headers=headers))
+        if args.history_every and (i + 1) % args.history_every == 0:
+            await recorder.call("history", client.get(f"/api/chat/history/{session_id}", headers=headers))
+
+
+def seed_users(fakes, count):
+    """Create the virtual users in the fake Supabase (one bcrypt hash shared by all)"""
+    from auth import get_password_hash
+
+    password_hash = get_password_hash(PASSWORD)
+    emails = []
+    for i in range(count):
+        email = f"{i // 1000 % 100:02d}LT{i % 1000:03d}@kpriet.ac.in"
+        fakes.supabase.table("users").insert({"email": email, "name": f"Student {i}", "password": password_hash, "role": "user"}).execute()
+        emails.append(email)
+    return emails
+
+
+async def run(args, queries, emails):
+    import httpx
+
+    if args.url:
+        transport, base_url = None, args.url
+    else:
+        from main import app
+        import readiness
+
+        # The ASGI transport doesn't run startup events; main() already built the index
+        readiness.set_status("ready", ready=True)
+        transport, base_url = httpx.ASGITransport(app=app), "http://loadtest"
+
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            virtual_user(client, recorder, email, args, queries, random.Random(rng.random()))
+            for email in emails
+        ))
+        elapsed = time.perf_counter() - start
+    return recorder.report(elapsed), elapsed
+
+
+def build_index(pdf_dir, site, index_path):
+    from chunker import chunk_text
+    from embedder import embed_and_store
+
+    pdf_texts, site_texts = load_corpus(pdf_dir, site)
+    chunks = chunk_text(pdf_texts + site_texts)
+    embed_and_store(chunks, index_path=index_path)
+    return len(chunks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent students against the chat API")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users")
+    parser.add_argument("--chats", type=int, default=5, help="Chat messages per user")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Mean seconds between a user's messages (exponential)")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="Seconds over which users log in")
+    parser.add_argument("--history-every", type=int, default=2, help="Fetch history after every N chats (0 = never)")
+    parser.add_argument("--queries", help="Text file with one query per line (default: built-in mix)")
+    parser.add_argument("--hot-ratio", type=float, default=0.0, help="Fraction of chats drawn from the hot queries")
+    parser.add_argument("--hot-queries", type=int, default=1, help="How many of the first queries form the hot set")
+    parser.add_argument("--groq-latency", type=float, default=0.5, help="Seconds added to each fake Groq call")
+    parser.add_argument("--supabase-latency", type=float, default=0.02, help="Seconds added to each fake Supabase call")
+    parser.add_argument("--pdf-dir", help="Build an index from these PDFs first (default: empty index)")
+    parser.add_argument("--snapshot", help="Serve scraped pages from a recorded site snapshot")
+    parser.add_argument("--url", help="Drive a running server instead of the in-process app (fakes then don't apply)")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Output JSON path (default: loadtest_results/<timestamp>.json)")
+    args = parser.parse_args()
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries) as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    fakes = install_fakes(groq_latency=args.groq_latency, supabase_latency=args.supabase_latency, snapshot_dir=args.snapshot)
+    work_dir = tempfile.mkdtemp(prefix="rag_loadtest_")
+
+    import vectorstore
+    vectorstore.FAISS_INDEX_PATH = os.path.join(work_dir, "index")
+
+    try:
+        chunks = 0
+        if args.pdf_dir or fakes.site is not None:
+            print("Building index...")
+            chunks = build_index(args.pdf_dir, fakes.site, vectorstore.FAISS_INDEX_PATH)
+
+        # Seeding goes straight to the fake, so it doesn't count towards the injected latency
+        latency, fakes.supabase.latency = fakes.supabase.latency, 0
+        emails = seed_users(fakes, args.users)
+        fakes.supabase.latency = latency
+
+        print(f"Running {args.users} users x {args.chats} chats...")
+        endpoints, elapsed = asyncio.run(run(args, queries, emails))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "commit": git_commit(),
+            "args": vars(args),
+            "index_chunks": chunks,
+        },
+        "seconds": round(elapsed, 3),
+        "endpoints": endpoints,
+    }
+
+    for name, stats in endpoints.items():
+        if stats["count"]:
+            print(f"  {name:<13} {stats['count']:>6} req  {stats['requests_per_sec']:>8} req/s  "
+                  f"p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms  "
+                  f"errors={stats['error_rate']:.1%}")
+
+    out = args.out or os.path.join("loadtest_results", f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,32 @@
-from fastapi import FastAPI, HTTPException, Depends, status, UploadFile, File
+from fastapi import FastAPI, HTTPException, Depends, status, UploadFile, File, Request, BackgroundTasks
+from fastapi.responses import PlainTextResponse, JSONResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from datetime import datetime
+import hashlib
+import json
 import os
+import time
 from typing import Optional, List
 from supabase import create_client, Client
 from dotenv import load_dotenv
-from pypdf import PdfReader
 
-from models import UserCreate, UserLogin, Token, UserResponse, ChatMessage, ChatResponse, UploadResponse
-from auth import create_access_token, decode_access_token
+from models import UserCreate, UserLogin, Token, UserResponse, ChatMessage, ChatResponse, UploadResponse, ProfilingSettings
+from auth import create_access_token, decode_access_token, check_password_async, get_password_hash_async, is_password_hash
 from supabase_client import supabase, supabase_admin
-from llm_agent import rag_query
-from chunker import preprocess_uploaded_doc
-from embedder import embed_and_store
-from config import PDF_DIR, FAISS_INDEX_PATH
-from initializer import initial_vectorization
+from llm_agent import rag_query, summarize_history
+from history import get_window, append_turn
+from guardrails import check_query
+from embedder import embed_pdf, delete_source, persist_vectorstore
+from config import PDF_DIR, FAISS_INDEX_PATH, USER_CACHE_SIZE, USER_CACHE_TTL, TIMING_HEADER_ENABLED, STARTUP_MODE, RERANK_ENABLED, UPLOAD_COLLECTION, WEBSITE_COLLECTION, CHAT_COALESCE_ENABLED, BATCH_QA_CONCURRENCY, BATCH_QA_MAX_QUERIES
+from ttl_cache import TTLCache
+from metrics import stage, start_trace, end_trace, server_timing, render_prometheus, REQUEST_SECONDS, Counter
+from singleflight import AsyncSingleFlight
+from vectorstore import load_collections, list_collections, get_embeddings, validate_collection, has_index, collection_path
+import readiness
+import retriever
+import profiling
 
 load_dotenv()
 
@@ -32,27 +43,126 @@ app.add_middleware(
 
 security = HTTPBearer()
 
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Collect per-stage timings and record request latency by route"""
+    token = start_trace()
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        elapsed = time.perf_counter() - start
+        trace = end_trace(token)
+        route = request.scope.get("route")
+        REQUEST_SECONDS.observe(
+            elapsed,
+            method=request.method,
+            route=route.path if route else "unmatched",
+            status=str(status_code)
+        )
+    if TIMING_HEADER_ENABLED:
+        timings = server_timing(trace)
+        response.headers["Server-Timing"] = f"{timings}, total;dur={elapsed * 1000:.1f}" if timings else f"total;dur={elapsed * 1000:.1f}"
+    return response
+
 # Ensure PDF directory exists
 os.makedirs(PDF_DIR, exist_ok=True)
 
-# Initialize vector store on startup
-@app.on_event("startup")
-async def startup_event():
-    """Initialize FAISS vector store if it doesn't exist"""
-    if not os.path.exists(FAISS_INDEX_PATH):
+def build_index_if_missing():
+    """Initialize FAISS vector store if it doesn't exist (or a previous build left it incomplete)"""
+    # The website crawl goes to its own collection; older deployments kept it in the root index
+    if not (has_index(collection_path(WEBSITE_COLLECTION)) or has_index(FAISS_INDEX_PATH)):
         print("FAISS index not found. Initializing vector store...")
+        # Imported here so Selenium/pypdf are only loaded when a crawl is needed
+        from initializer import initial_vectorization
         try:
             initial_vectorization()
-            print("Vector store initialized successfully!")
         except Exception as e:
-            print(f"Error initializing vector store: {e}")
+            # The PDFs are indexed before the crawl, so a failed crawl can still leave something to answer from
+            if not list_collections():
+                raise
+            print(f"Index build incomplete, serving the collections that were built: {e}")
+            readiness.warn(f"indexing: {e}")
+            return
+        print("Vector store initialized successfully!")
     else:
         print("FAISS index found. Vector store ready.")
 
+def warm_up():
+    """Load the embedding model and index into memory before the first chat"""
+    if retriever.is_remote():
+        # Thin worker: the retrieval service holds the model and index
+        print(f"Using retrieval service: {retriever.health()}")
+    else:
+        get_embeddings()
+        load_collections()
+    if RERANK_ENABLED:
+        from reranker import get_reranker
+        get_reranker()
+
+# Initialize vector store on startup
+@app.on_event("startup")
+async def startup_event():
+    steps = [("indexing", build_index_if_missing), ("warming", warm_up)]
+    if retriever.is_remote():
+        # The retrieval service owns the index; a thin worker only checks it can reach it
+        steps = [("warming", warm_up)]
+    if STARTUP_MODE == "blocking":
+        for step_status, step in steps:
+            readiness.set_status(step_status)
+            try:
+                step()
+            except Exception as e:
+                print(f"Error during startup ({step_status}): {e}")
+                readiness.set_status("degraded", error=f"{step_status}: {e}")
+                return
+        readiness.set_status("ready", ready=True)
+    else:
+        # Serve immediately; the crawl/index build and model load happen on a worker thread
+        readiness.run_in_background(steps)
+
+@app.get("/health/live")
+async def liveness():
+    """The process is up and serving requests"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Ready once the index is built and the model/index are loaded"""
+    state = readiness.get_status()
+    if not state["ready"]:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=state)
+    return state
+
+# email -> user profile (only found users are cached; never the password column)
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
 # Helper functions
+def lookup_user(email: str):
+    """Cached profile for email, None if there is no such user; Supabase errors propagate"""
+    user = user_cache.get(email)
+    if user is not None:
+        return user
+    response = supabase.table('users').select('email,name,role').eq('email', email).execute()
+    if response.data and len(response.data) > 0:
+        user = response.data[0]
+        user_cache.set(email, user)
+        return user
+    return None
+
 def get_user_by_email(email: str):
     try:
-        response = supabase.table('users').select('*').eq('email', email).execute()
+        return lookup_user(email)
+    except Exception as e:
+        print(f"Error fetching user: {e}")
+        return None
+
+def get_user_credentials(email: str):
+    """User row including the stored password (uncached; only for login)"""
+    try:
+        response = supabase.table('users').select('email,name,password,role').eq('email', email).execute()
         if response.data and len(response.data) > 0:
             return response.data[0]
         return None
@@ -60,14 +170,22 @@ def get_user_by_email(email: str):
         print(f"Error fetching user: {e}")
         return None
 
-def create_user(user_data: UserCreate):
+def invalidate_user(email: Optional[str] = None):
+    """Drop a cached user profile (or all of them) after it changes"""
+    if email is None:
+        user_cache.clear()
+    else:
+        user_cache.pop(email)
+
+def create_user(user_data: UserCreate, password_hash: str):
     try:
         response = supabase_admin.table('users').insert({
             'name': user_data.username,
             'email': user_data.email,
-            'password': user_data.password,
+            'password': password_hash,
             'role': user_data.role
         }).execute()
+        invalidate_user(user_data.email)
         
         if response.data:
             return user_data.email
@@ -76,6 +194,15 @@ def create_user(user_data: UserCreate):
         print(f"Error creating user: {e}")
         return None
 
+def update_user_password(email: str, password_hash: str):
+    """Replace a stored password (used to upgrade legacy plain-text rows)"""
+    try:
+        supabase_admin.table('users').update({'password': password_hash}).eq('email', email).execute()
+    except Exception as e:
+        print(f"Error updating password: {e}")
+    finally:
+        invalidate_user(email)
+
 def get_or_create_session(email: str):
     """Get the latest session or create a new one"""
     try:
@@ -100,13 +227,14 @@ def get_or_create_session(email: str):
 def save_message(session_id: int, email: str, role: str, content: str):
     """Save a message to the database"""
     try:
-        supabase_admin.table("chat_messages").insert({
-            "session_id": session_id,
-            "email": email,
-            "role": role,
-            "content": content
-        }).execute()
-        supabase_admin.table("chat_sessions").update({"updated_at": "now()"}).eq("id", session_id).execute()
+        with stage("persist"):
+            supabase_admin.table("chat_messages").insert({
+                "session_id": session_id,
+                "email": email,
+                "role": role,
+                "content": content
+            }).execute()
+            supabase_admin.table("chat_sessions").update({"updated_at": "now()"}).eq("id", session_id).execute()
     except Exception as e:
         print(f"Error saving message: {e}")
 
@@ -123,9 +251,24 @@ def get_session_messages(session_id: int):
         print(f"Error loading messages: {e}")
         return []
 
+def get_recent_messages(session_id: int, limit: int):
+    """Get the latest messages for a session, oldest first"""
+    try:
+        resp = supabase.table("chat_messages") \
+            .select("role, content, created_at") \
+            .eq("session_id", session_id) \
+            .order("created_at", desc=True) \
+            .limit(limit) \
+            .execute()
+        return list(reversed(resp.data or []))
+    except Exception as e:
+        print(f"Error loading recent messages: {e}")
+        return []
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
-    payload = decode_access_token(token)
+    with stage("auth"):
+        payload = decode_access_token(token)
     
     if payload is None:
         raise HTTPException(
@@ -142,7 +285,20 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             detail="Invalid authentication credentials"
         )
     
-    return {"email": user_email, "role": role}
+    # The role in the token is as old as the token; prefer the (cached) profile
+    try:
+        with stage("user_lookup"):
+            user = await run_in_threadpool(lookup_user, user_email)
+    except Exception as e:
+        print(f"Error fetching user, using the token role: {e}")
+        user = {"role": role}
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials"
+        )
+    
+    return {"email": user_email, "role": user.get("role")}
 
 # Authentication endpoints
 @app.post("/api/auth/signup", status_code=status.HTTP_201_CREATED)
@@ -154,7 +310,8 @@ async def signup(user_data: UserCreate):
             detail="User with this email already exists"
         )
     
-    user_id = create_user(user_data)
+    password_hash = await get_password_hash_async(user_data.password)
+    user_id = create_user(user_data, password_hash)
     if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -165,7 +322,7 @@ async def signup(user_data: UserCreate):
 
 @app.post("/api/auth/login", response_model=Token)
 async def login(user_data: UserLogin):
-    user = get_user_by_email(user_data.email)
+    user = get_user_credentials(user_data.email)
     
     if not user:
         raise HTTPException(
@@ -176,7 +333,8 @@ async def login(user_data: UserLogin):
     stored_password = user.get('password')
     
     # Support both plain text and hashed passwords
-    is_valid = (user_data.password == stored_password)
+    with stage("password_verify"):
+        is_valid = await check_password_async(user_data.password, stored_password)
     
     if not is_valid:
         raise HTTPException(
@@ -184,6 +342,10 @@ async def login(user_data: UserLogin):
             detail="Invalid credentials"
         )
     
+    # Upgrade legacy plain-text passwords to bcrypt on successful login
+    if not is_password_hash(stored_password):
+        update_user_password(user.get('email'), await get_password_hash_async(user_data.password))
+    
     access_token = create_access_token(
         data={"sub": user.get('email'), "role": user.get('role')}
     )
@@ -202,22 +364,80 @@ async def login(user_data: UserLogin):
     )
 
 # Chat endpoints
+COALESCED_QUERIES = Counter(
+    "rag_coalesced_queries_total",
+    "Chat queries answered by an identical query already in flight (RAG/LLM calls saved)"
+)
+chat_flights = AsyncSingleFlight()
+
+def query_key(query, history, collections):
+    """
+    Coalescing key: the query (case and whitespace folded), collections and a
+    hash of the history window. Any history can change the answer (a follow-up
+    like "what about hostel fees?"), so only fresh sessions share answers
+    without an identical window.
+    """
+    if (history or {}).get("turns") or (history or {}).get("summary"):
+        context = hashlib.sha256(json.dumps(history, sort_keys=True, default=str).encode()).hexdigest()
+    else:
+        context = None
+    return (retriever.normalize_query(query), tuple(sorted(collections)) if collections else None, context)
+
+async def answer_query(query, history, collections):
+    """Run rag_query off the event loop, sharing the answer with identical in-flight queries"""
+    if not CHAT_COALESCE_ENABLED:
+        return await run_in_threadpool(rag_query, query, history=history, collections=collections)
+
+    key = query_key(query, history, collections)
+    if chat_flights.in_flight(key):
+        COALESCED_QUERIES.inc()
+        with stage("coalesced_wait"):
+            return await chat_flights.do(key, run_in_threadpool, rag_query, query, history=history, collections=collections)
+    return await chat_flights.do(key, run_in_threadpool, rag_query, query, history=history, collections=collections)
+
 @app.post("/api/chat/{session_id}", response_model=ChatResponse)
 async def chat(session_id: int, message: ChatMessage, current_user: dict = Depends(get_current_user)):
     email = current_user['email']
     
+    state = readiness.get_status()
+    if not state["ready"]:
+        if state["status"] == "degraded":
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"The knowledge base is unavailable: {state['error']}"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The knowledge base is still being built. Please try again shortly.",
+            headers={"Retry-After": "30"}
+        )
+    
+    # Refuse harmful queries before any history summarization, retrieval or LLM call
+    with stage("guardrails"):
+        blocked = await run_in_threadpool(check_query, message.message)
+    
+    # Recent turns (before this message) for follow-up questions
+    if blocked is None:
+        with stage("history"):
+            history = await run_in_threadpool(get_window, session_id, get_recent_messages, summarize_history)
+    
     # Save user message
     save_message(session_id, email, "user", message.message)
+    append_turn(session_id, "user", message.message)
     
     # Get RAG response
-    try:
-        response_text = rag_query(message.message)
-    except Exception as e:
-        print(f"Error in RAG query: {e}")
-        response_text = "I apologize, but I encountered an error processing your request. Please try again."
+    if blocked is not None:
+        response_text = blocked
+    else:
+        try:
+            response_text = await answer_query(message.message, history, message.collections)
+        except Exception as e:
+            print(f"Error in RAG query: {e}")
+            response_text = "I apologize, but I encountered an error processing your request. Please try again."
     
     # Save assistant response
     save_message(session_id, email, "assistant", response_text)
+    append_turn(session_id, "assistant", response_text)
     
     return ChatResponse(
         response=response_text,
@@ -261,6 +481,8 @@ async def get_chat_history(session_id: int, current_user: dict = Depends(get_cur
 @app.post("/api/admin/upload", response_model=UploadResponse)
 async def upload_file(
     file: UploadFile = File(...),
+    replace: bool = False,
+    collection: str = UPLOAD_COLLECTION,
     current_user: dict = Depends(get_current_user)
 ):
     if current_user['role'] != 'admin':
@@ -276,51 +498,63 @@ async def upload_file(
             detail="Only PDF files are allowed"
         )
     
+    try:
+        validate_collection(collection)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
     # Save file with original name
     file_path = os.path.join(PDF_DIR, file.filename)
     
     # Check if file already exists
-    if os.path.exists(file_path):
+    already_exists = os.path.exists(file_path)
+    if already_exists and not replace:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
-            detail=f"File '{file.filename}' already exists"
+            detail=f"File '{file.filename}' already exists. Upload with replace=true to re-index it."
         )
     
-    content = await file.read()
-    with open(file_path, "wb") as f:
-        f.write(content)
+    # Write to a temporary path so a failed replace keeps the current version
+    upload_path = f"{file_path}.uploading"
+    file_size = 0
+    with open(upload_path, "wb") as f:
+        # Copied 1 MB at a time rather than read into memory whole
+        while block := await file.read(1 << 20):
+            f.write(block)
+            file_size += len(block)
     
-    file_size = len(content)
     upload_date = datetime.utcnow().isoformat()
     
     # Process PDF and embed into FAISS vector store
     try:
         print(f"Processing PDF: {file.filename}")
-        pdf_reader = PdfReader(file_path)
-        text = " ".join([page.extract_text() for page in pdf_reader.pages if page.extract_text()])
+        # Chunked page by page and embedded in batches on a worker thread, keeping the event loop free.
+        # Replacing drops only this document's vectors, then re-embeds only this document.
+        vectorstore = await run_in_threadpool(
+            embed_pdf, upload_path, source=file.filename, collection=collection, replace=already_exists
+        )
         
-        if not text.strip():
+        if vectorstore is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="PDF appears to be empty or contains no extractable text"
             )
         
-        chunks = preprocess_uploaded_doc(text)
-        print(f"Generated {len(chunks)} chunks from PDF")
-        
-        # Embed and append to existing FAISS index
-        embed_and_store(chunks)
-        print(f"Successfully embedded {file.filename} into vector store")
+        os.replace(upload_path, file_path)
+        print(f"Successfully embedded {file.filename} into collection '{collection}'")
         
     except HTTPException:
         # Remove the file if processing failed
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        if os.path.exists(upload_path):
+            os.remove(upload_path)
         raise
     except Exception as e:
         # Remove the file if processing failed
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        if os.path.exists(upload_path):
+            os.remove(upload_path)
         print(f"Error processing PDF: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -331,9 +565,51 @@ async def upload_file(
         filename=file.filename,
         file_id=file.filename,
         size=file_size,
-        upload_date=upload_date
+        upload_date=upload_date,
+        collection=collection
     )
 
+@app.delete("/api/admin/files/{file_id}")
+async def delete_file(
+    file_id: str,
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(get_current_user)
+):
+    """Delete an uploaded PDF and remove its chunks from the vector store"""
+    if current_user['role'] != 'admin':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can delete files"
+        )
+    
+    if os.path.basename(file_id) != file_id or not file_id.endswith('.pdf'):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid file id"
+        )
+    
+    file_path = os.path.join(PDF_DIR, file_id)
+    if not os.path.exists(file_path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"File '{file_id}' not found"
+        )
+    
+    try:
+        removed = await run_in_threadpool(delete_source, file_id, persist=False)
+        os.remove(file_path)
+    except Exception as e:
+        print(f"Error deleting file: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to delete file: {str(e)}"
+        )
+    
+    # Searches already skip the removed chunks; writing the index to disk happens after the response
+    background_tasks.add_task(persist_vectorstore)
+    
+    return {"message": f"File '{file_id}' deleted", "file_id": file_id, "removed_chunks": removed}
+
 @app.get("/api/admin/files")
 async def get_files(current_user: dict = Depends(get_current_user)):
     if current_user['role'] != 'admin':
@@ -375,9 +651,72 @@ async def get_files(current_user: dict = Depends(get_current_user)):
         print(f"Error fetching files: {e}")
         return {"files": [], "total_files": 0, "total_size": 0}
 
+@app.get("/api/admin/collections")
+async def get_collections(current_user: dict = Depends(get_current_user)):
+    """List index collections (shards) with their chunk counts"""
+    if current_user['role'] != 'admin':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can view collections"
+        )
+    
+    try:
+        from embedder import source_ids
+        collections = []
+        for name, vectorstore in load_collections().items():
+            collections.append({
+                "name": name,
+                "chunks": vectorstore.index.ntotal,
+                "sources": sorted(source_ids(vectorstore))
+            })
+        return {"collections": collections}
+    except Exception as e:
+        print(f"Error listing collections: {e}")
+        return {"collections": []}
+
+@app.post("/api/admin/batch-qa")
+async def batch_qa_endpoint(
+    file: UploadFile = File(...),
+    k: int = 3,
+    concurrency: int = BATCH_QA_CONCURRENCY,
+    collection: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Answer a file of queries (one per line, or JSONL {"id", "query"}); returns JSONL"""
+    if current_user['role'] != 'admin':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can run batch queries"
+        )
+    
+    from batch_qa import parse_queries, answer_batch
+    try:
+        queries = parse_queries((await file.read()).decode("utf-8").splitlines())
+    except (UnicodeDecodeError, ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid query file: {e}")
+    if len(queries) > BATCH_QA_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_QA_MAX_QUERIES} queries per batch")
+    collections = None
+    if collection:
+        try:
+            collections = [validate_collection(collection)]
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    records, batch_timings = await run_in_threadpool(
+        answer_batch, queries, k=max(1, k), collections=collections,
+        concurrency=max(1, min(concurrency, BATCH_QA_CONCURRENCY * 4))
+    )
+    body = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+    return PlainTextResponse(
+        body,
+        media_type="application/x-ndjson",
+        headers={"X-Batch-Timings": json.dumps(batch_timings)}
+    )
+
 @app.get("/api/admin/cache/info")
-async def get_cache_info(current_user: dict = Depends(get_current_user)):
-    """Get information about cached web content"""
+async def get_cache_info(limit: int = 100, current_user: dict = Depends(get_current_user)):
+    """Get information about cached web content (first `limit` entries) and hit/miss counters"""
     if current_user['role'] != 'admin':
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -386,10 +725,54 @@ async def get_cache_info(current_user: dict = Depends(get_current_user)):
     
     try:
         from realtime_scraper import get_cache_info
-        return get_cache_info()
+        return await run_in_threadpool(get_cache_info, max(0, limit))
     except Exception as e:
         return {"status": f"Error: {e}", "cached_urls": []}
 
+@app.get("/api/admin/cache/stats")
+async def get_cache_stats(current_user: dict = Depends(get_current_user)):
+    """Scrape cache hit/miss counters and compression ratio (no Redis round trip)"""
+    if current_user['role'] != 'admin':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can view cache stats"
+        )
+    from realtime_scraper import get_cache_stats
+    return get_cache_stats()
+
+@app.get("/api/admin/retrieval/cache")
+async def get_retrieval_cache_stats(current_user: dict = Depends(get_current_user)):
+    """Hit ratios of the query-embedding and top-k result caches"""
+    if current_user['role'] != 'admin':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can view cache stats"
+        )
+    return retriever.cache_stats()
+
+@app.get("/api/admin/profiling")
+async def get_profiling(current_user: dict = Depends(get_current_user)):
+    """Current profiling settings and the most recent profiles written"""
+    if current_user['role'] != 'admin':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can view profiling"
+        )
+    return {"settings": profiling.get_settings(), "targets": list(profiling.TARGETS), "recent": profiling.recent_profiles()}
+
+@app.post("/api/admin/profiling")
+async def update_profiling(settings: ProfilingSettings, current_user: dict = Depends(get_current_user)):
+    """Turn profiling on/off or change its mode, targets, sampling rate or memory snapshots"""
+    if current_user['role'] != 'admin':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can change profiling"
+        )
+    try:
+        return {"settings": profiling.configure(**settings.dict())}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.post("/api/admin/cache/clear")
 async def clear_cache(current_user: dict = Depends(get_current_user)):
     """Clear all cached web content"""
@@ -401,14 +784,37 @@ async def clear_cache(current_user: dict = Depends(get_current_user)):
     
     try:
         from realtime_scraper import clear_cache
-        clear_cache()
-        return {"message": "Cache cleared successfully"}
+        removed = await run_in_threadpool(clear_cache)
+        return {"message": "Cache cleared successfully", "removed": removed}
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to clear cache: {str(e)}"
         )
 
+@app.post("/api/admin/guardrails/reload")
+async def reload_guardrails(current_user: dict = Depends(get_current_user)):
+    """Recompile guardrail patterns from GUARDRAIL_PATTERNS_FILE"""
+    if current_user['role'] != 'admin':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can reload guardrails"
+        )
+    
+    try:
+        from guardrails import reload_patterns
+        return {"message": "Guardrails reloaded", "patterns": reload_patterns()}
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to reload guardrails: {str(e)}"
+        )
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 async def root():
     return {"message": "Role-based Auth API with RAG"}
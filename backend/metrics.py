@@ -0,0 +1,173 @@
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; tuned for a pipeline whose stages range from sub-ms cache hits to multi-second LLM calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = []
+_registry_lock = threading.Lock()
+
+# Per-request list of (stage, seconds), set by the HTTP middleware
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        return self._values.get(key, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition format"""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series = {}  # label values -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {total}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "rag_stage_duration_seconds",
+    "Time spent in each stage of the chat pipeline",
+    labelnames=("stage",)
+)
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    labelnames=("method", "route", "status")
+)
+
+
+def start_trace():
+    """Begin collecting stage timings for the current request; returns a token for end_trace"""
+    return _current_trace.set([])
+
+
+def end_trace(token):
+    """Stop collecting and return the (stage, seconds) list for the request"""
+    trace = _current_trace.get()
+    _current_trace.reset(token)
+    return trace or []
+
+
+def record_stage(name, seconds):
+    STAGE_SECONDS.observe(seconds, stage=name)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.append((name, seconds))
+
+
+@contextmanager
+def stage(name):
+    """Time a block as a pipeline stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+def timed(name):
+    """Decorator form of stage()"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def server_timing(trace):
+    """Format a trace as a Server-Timing header value (durations in ms, repeated stages summed)"""
+    totals = {}
+    for name, seconds in trace:
+        totals[name] = totals.get(name, 0.0) + seconds
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in totals.items())
+
+
+def render_prometheus():
+    """Render every registered metric in the Prometheus text format"""
+    lines = []
+    with _registry_lock:
+        metrics = list(_registry)
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Literal
+from typing import Literal, List, Optional
 
 class UserCreate(BaseModel):
     username: str
@@ -24,6 +24,7 @@ class Token(BaseModel):
 
 class ChatMessage(BaseModel):
     message: str
+    collections: Optional[List[str]] = None
 
 class ChatResponse(BaseModel):
     response: str
@@ -34,3 +35,12 @@ class UploadResponse(BaseModel):
     file_id: str
     size: int
     upload_date: str
+    collection: Optional[str] = None
+
+class ProfilingSettings(BaseModel):
+    enabled: Optional[bool] = None
+    mode: Optional[Literal["sample", "cprofile"]] = None
+    memory: Optional[bool] = None
+    targets: Optional[List[str]] = None
+    rate: Optional[float] = None
+    interval_ms: Optional[float] = None
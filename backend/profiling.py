@@ -0,0 +1,234 @@
+# profiling.py
+"""
+Opt-in profiling of ingestion and query hot paths.
+
+Functions decorated with @profiled(name) run untouched unless profiling
+is enabled (PROFILING_ENABLED or POST /api/admin/profiling) for that
+target. When enabled, a call is profiled with either:
+
+- "sample": a background thread samples the calling thread's stack every
+  PROFILING_INTERVAL_MS and writes a speedscope JSON file
+  (open at https://www.speedscope.app), or
+- "cprofile": cProfile, written as a .pstats file (python -m pstats, snakeviz)
+
+and optionally a tracemalloc snapshot (.tracemalloc, load with
+tracemalloc.Snapshot.load) plus the call's peak traced memory.
+
+One call is profiled at a time per process (cProfile and tracemalloc are
+process-wide); nested targets (initial_vectorization -> chunk_text ->
+embed_and_store) and concurrent calls while a profile is running just run
+normally.
+"""
+import cProfile
+import functools
+import json
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from datetime import datetime
+
+from config import (
+    PROFILING_ENABLED, PROFILING_MODE, PROFILING_DIR, PROFILING_TARGETS,
+    PROFILING_RATE, PROFILING_INTERVAL_MS, PROFILING_MEMORY
+)
+
+TARGETS = ("initial_vectorization", "chunk_text", "embed_pdf", "embed_and_store", "rag_query")
+MODES = ("sample", "cprofile")
+
+_settings = {
+    "enabled": PROFILING_ENABLED,
+    "mode": PROFILING_MODE if PROFILING_MODE in MODES else "sample",
+    "memory": PROFILING_MEMORY,
+    "targets": list(PROFILING_TARGETS or TARGETS),
+    "rate": PROFILING_RATE,
+    "interval_ms": PROFILING_INTERVAL_MS,
+    "directory": PROFILING_DIR,
+}
+_lock = threading.Lock()
+# Held while a profile is being recorded
+_busy = threading.Lock()
+_recent = deque(maxlen=50)
+_sequence = 0
+
+
+def get_settings():
+    return dict(_settings, targets=list(_settings["targets"]))
+
+
+def configure(**changes):
+    """
+    Update profiling settings at runtime (enabled, mode, memory, targets, rate, interval_ms).
+
+    Raises:
+        ValueError: On an unknown mode or target, or an out-of-range rate/interval
+    """
+    changes = {k: v for k, v in changes.items() if v is not None}
+    if "mode" in changes and changes["mode"] not in MODES:
+        raise ValueError(f"Unknown profiling mode: {changes['mode']!r}")
+    if "targets" in changes:
+        unknown = set(changes["targets"]) - set(TARGETS)
+        if unknown:
+            raise ValueError(f"Unknown profiling targets: {sorted(unknown)}")
+    if "rate" in changes and not 0 < changes["rate"] <= 1:
+        raise ValueError("rate must be in (0, 1]")
+    if "interval_ms" in changes and changes["interval_ms"] < 0.5:
+        raise ValueError("interval_ms must be at least 0.5")
+    with _lock:
+        _settings.update(changes)
+    return get_settings()
+
+
+def recent_profiles():
+    """Most recent profiles written by this process, newest first"""
+    return list(reversed(_recent))
+
+
+class StackSampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval"""
+
+    def __init__(self, thread_id, interval_ms):
+        super().__init__(name="profiling-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval_ms / 1000
+        self.frames = []
+        self._frame_index = {}
+        self.samples = []
+        self.weights = []
+        self._stop_event = threading.Event()
+
+    def _index(self, code):
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        index = self._frame_index.get(key)
+        if index is None:
+            index = self._frame_index[key] = len(self.frames)
+            self.frames.append({"name": code.co_name, "file": code.co_filename, "line": code.co_firstlineno})
+        return index
+
+    def run(self):
+        last = time.perf_counter()
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._index(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self.samples.append(stack)
+            self.weights.append((now - last) * 1000)
+            last = now
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def speedscope(self, name):
+        """The samples as a speedscope file (sampled profile, milliseconds)"""
+        total = sum(self.weights)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": self.frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": total,
+                "samples": self.samples,
+                "weights": self.weights,
+            }],
+            "name": name,
+            "activeProfileIndex": 0,
+            "exporter": "coe-chat-bot profiling.py",
+        }
+
+
+def _output_path(name, extension):
+    global _sequence
+    with _lock:
+        _sequence += 1
+        sequence = _sequence
+    os.makedirs(_settings["directory"], exist_ok=True)
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+    return os.path.join(_settings["directory"], f"{name}-{stamp}-{os.getpid()}-{sequence}.{extension}")
+
+
+def _should_profile(name):
+    if not _settings["enabled"] or name not in _settings["targets"]:
+        return False
+    return _settings["rate"] >= 1 or random.random() < _settings["rate"]
+
+
+def _run_profiled(name, func, args, kwargs):
+    settings = get_settings()
+    record = {"target": name, "mode": settings["mode"], "files": []}
+
+    started_tracing = False
+    if settings["memory"]:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(25)
+            started_tracing = True
+        tracemalloc.reset_peak()
+
+    profiler = sampler = None
+    if settings["mode"] == "cprofile":
+        profiler = cProfile.Profile()
+    else:
+        sampler = StackSampler(threading.get_ident(), settings["interval_ms"])
+        sampler.start()
+
+    start = time.perf_counter()
+    try:
+        if profiler is not None:
+            return profiler.runcall(func, *args, **kwargs)
+        return func(*args, **kwargs)
+    finally:
+        record["seconds"] = round(time.perf_counter() - start, 4)
+        try:
+            if profiler is not None:
+                path = _output_path(name, "pstats")
+                profiler.dump_stats(path)
+                record["files"].append(path)
+            else:
+                sampler.stop()
+                path = _output_path(name, "speedscope.json")
+                with open(path, "w") as f:
+                    json.dump(sampler.speedscope(name), f)
+                record["files"].append(path)
+                record["samples"] = len(sampler.samples)
+
+            if settings["memory"]:
+                _, peak = tracemalloc.get_traced_memory()
+                record["peak_traced_kb"] = round(peak / 1024, 1)
+                path = _output_path(name, "tracemalloc")
+                tracemalloc.take_snapshot().dump(path)
+                record["files"].append(path)
+            _recent.append(record)
+            print(f"Profiled {name} in {record['seconds']}s -> {', '.join(record['files'])}")
+        except Exception as e:
+            print(f"Error writing profile for {name}: {e}")
+        finally:
+            # Tracing slows every allocation, so it must not outlive the call even if a write failed
+            if started_tracing:
+                tracemalloc.stop()
+
+
+def profiled(name):
+    """Profile calls to the decorated function as target `name` when profiling is enabled for it"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _settings["enabled"] or not _should_profile(name) or not _busy.acquire(blocking=False):
+                return func(*args, **kwargs)
+            try:
+                return _run_profiled(name, func, args, kwargs)
+            finally:
+                _busy.release()
+        return wrapper
+    return decorator
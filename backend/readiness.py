@@ -0,0 +1,67 @@
+import threading
+import time
+from datetime import datetime
+
+_lock = threading.Lock()
+_state = {
+    "status": "starting",
+    "ready": False,
+    "error": None,
+    "warnings": [],
+    "started_at": datetime.utcnow().isoformat(),
+    "ready_at": None,
+    "startup_seconds": None
+}
+_started = time.monotonic()
+
+
+def set_status(status: str, ready: bool = False, error: str = None):
+    """Update the readiness state reported by /health/ready"""
+    with _lock:
+        _state["status"] = status
+        _state["ready"] = ready
+        _state["error"] = error
+        if ready and _state["ready_at"] is None:
+            _state["ready_at"] = datetime.utcnow().isoformat()
+            _state["startup_seconds"] = round(time.monotonic() - _started, 3)
+
+
+def warn(message: str):
+    """Record a startup problem that left the service usable (e.g. a failed crawl)"""
+    with _lock:
+        _state["warnings"].append(message)
+
+
+def get_status() -> dict:
+    with _lock:
+        state = dict(_state)
+        state["warnings"] = list(_state["warnings"])
+        return state
+
+
+def is_ready() -> bool:
+    with _lock:
+        return _state["ready"]
+
+
+def run_in_background(steps):
+    """
+    Run startup steps on a daemon thread, updating the readiness state as it goes.
+
+    Args:
+        steps: List of (status, callable) pairs run in order
+    """
+    def worker():
+        for status, step in steps:
+            set_status(status)
+            try:
+                step()
+            except Exception as e:
+                print(f"Startup step '{status}' failed: {e}")
+                set_status("degraded", ready=False, error=f"{status}: {e}")
+                return
+        set_status("ready", ready=True)
+
+    thread = threading.Thread(target=worker, name="startup", daemon=True)
+    thread.start()
+    return thread
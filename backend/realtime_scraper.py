@@ -1,38 +1,16 @@
-import redis
 import requests
-from bs4 import BeautifulSoup
-from datetime import timedelta
-import os
-from dotenv import load_dotenv
+from html_extract import extract_text
+import scrape_cache
+from scrape_cache import CACHE_EXPIRY
+from singleflight import SingleFlight
 
-load_dotenv()
-
-# Redis configuration
-REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
-REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
-REDIS_DB = int(os.getenv("REDIS_DB", 0))
-CACHE_EXPIRY = int(os.getenv("CACHE_EXPIRY_HOURS", 24)) * 3600  # Convert hours to seconds
-
-# Initialize Redis client (will be None if Redis is not available)
-try:
-    redis_client = redis.Redis(
-        host=REDIS_HOST,
-        port=REDIS_PORT,
-        db=REDIS_DB,
-        decode_responses=True,
-        socket_connect_timeout=2
-    )
-    # Test connection
-    redis_client.ping()
-    print("Redis connected successfully")
-except Exception as e:
-    print(f"Redis not available: {e}. Caching disabled.")
-    redis_client = None
+# Concurrent cache misses for the same URL share one fetch
+_fetches = SingleFlight()
 
 
 def scrape_website(url: str, use_cache: bool = True) -> str:
     """
-    Scrape a website and cache the result in Redis.
+    Scrape a website and cache the result (in-process and in Redis).
     
     Args:
         url: The URL to scrape
@@ -41,19 +19,24 @@ def scrape_website(url: str, use_cache: bool = True) -> str:
     Returns:
         Scraped text content
     """
-    cache_key = f"scrape:{url}"
-    
-    # Try to get from cache if Redis is available and caching is enabled
-    if redis_client and use_cache:
-        try:
-            cached_content = redis_client.get(cache_key)
-            if cached_content:
-                print(f"Cache hit for {url}")
-                return cached_content
-        except Exception as e:
-            print(f"Redis get error: {e}")
-    
-    # Scrape the website
+    # Try to get from cache if caching is enabled
+    if use_cache:
+        cached_content = scrape_cache.lookup(url)
+        if cached_content:
+            return cached_content
+        return _fetches.do(url, _fetch, url)
+    return _fetch(url)
+
+
+def _response_encoding(response):
+    """Charset from the Content-Type header, else guessed from the body (requests would assume Latin-1)"""
+    if "charset=" in response.headers.get("Content-Type", "").lower():
+        return response.encoding
+    return response.apparent_encoding
+
+
+def _fetch(url: str) -> str:
+    """Scrape a page and store it in the cache; returns "" on failure"""
     try:
         print(f"Scraping {url}...")
         headers = {
@@ -62,28 +45,12 @@ def scrape_website(url: str, use_cache: bool = True) -> str:
         response = requests.get(url, headers=headers, timeout=10)
         response.raise_for_status()
         
-        # Parse HTML
-        soup = BeautifulSoup(response.content, 'lxml')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style", "nav", "footer", "header"]):
-            script.decompose()
-        
-        # Get text content
-        text = soup.get_text(separator=' ', strip=True)
+        # Parse HTML once, skipping script/style/nav/footer/header
+        text = extract_text(response.content, encoding=_response_encoding(response))
         
-        # Clean up whitespace
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
-        
-        # Cache the result if Redis is available
-        if redis_client:
-            try:
-                redis_client.setex(cache_key, CACHE_EXPIRY, text)
-                print(f"Cached content for {url} (expires in {CACHE_EXPIRY/3600} hours)")
-            except Exception as e:
-                print(f"Redis set error: {e}")
+        # Cache the result (locally, and in Redis if available)
+        if scrape_cache.store(url, text):
+            print(f"Cached content for {url} (expires in {CACHE_EXPIRY/3600} hours)")
         
         return text
         
@@ -101,48 +68,27 @@ def clear_cache(url: str = None):
     
     Args:
         url: Specific URL to clear, or None to clear all scrape cache
+
+    Returns:
+        Number of entries removed
     """
-    if not redis_client:
-        print("Redis not available")
-        return
-    
     try:
-        if url:
-            cache_key = f"scrape:{url}"
-            redis_client.delete(cache_key)
-            print(f"Cleared cache for {url}")
-        else:
-            # Clear all scrape cache
-            keys = redis_client.keys("scrape:*")
-            if keys:
-                redis_client.delete(*keys)
-                print(f"Cleared {len(keys)} cached entries")
-            else:
-                print("No cached entries found")
+        return scrape_cache.clear(url)
     except Exception as e:
         print(f"Error clearing cache: {e}")
+        return 0
 
 
-def get_cache_info():
-    """Get information about cached entries"""
-    if not redis_client:
-        return {"status": "Redis not available", "cached_urls": []}
-    
+def get_cache_info(limit: int = 100):
+    """Get information about cached entries (at most `limit` listed) and hit/miss counters"""
     try:
-        keys = redis_client.keys("scrape:*")
-        cached_urls = []
-        for key in keys:
-            ttl = redis_client.ttl(key)
-            url = key.replace("scrape:", "")
-            cached_urls.append({
-                "url": url,
-                "expires_in_seconds": ttl
-            })
-        
-        return {
-            "status": "connected",
-            "total_cached": len(cached_urls),
-            "cached_urls": cached_urls
-        }
+        info = scrape_cache.info(limit)
     except Exception as e:
-        return {"status": f"Error: {e}", "cached_urls": []}
+        info = {"status": f"Error: {e}", "cached_urls": []}
+    info["stats"] = get_cache_stats()
+    return info
+
+
+def get_cache_stats():
+    """Cache hit/miss counters plus how many fetches were shared by concurrent misses"""
+    return {**scrape_cache.stats(), "fetches": _fetches.stats()}
@@ -0,0 +1,67 @@
+import threading
+import time
+from config import RERANK_MODEL, RERANK_BATCH_SIZE, RERANK_BUDGET_MS
+from metrics import Counter
+
+RERANK_RUNS = Counter(
+    "rag_rerank_total",
+    "Rerank calls by outcome (complete, partial = budget ran out, skipped = fell back to vector order)",
+    labelnames=("outcome",)
+)
+
+_lock = threading.Lock()
+_model = None
+
+def get_reranker():
+    """Process-wide cross-encoder; the first call loads the model"""
+    global _model
+    if _model is None:
+        with _lock:
+            if _model is None:
+                from sentence_transformers import CrossEncoder
+                _model = CrossEncoder(RERANK_MODEL, device="cpu")
+    return _model
+
+def rerank(query, docs, top_n, budget_ms=RERANK_BUDGET_MS, batch_size=RERANK_BATCH_SIZE):
+    """
+    Reorder candidate documents by cross-encoder relevance within a time budget.
+
+    Candidates are scored in batches in vector order. When the budget runs out,
+    the scored candidates are ranked by score and the rest keep their vector
+    order after them; if nothing could be scored the vector order is returned.
+
+    Args:
+        query: Search query
+        docs: Candidate documents, best vector match first
+        top_n: Number of documents to return
+        budget_ms: Time budget for scoring
+        batch_size: Pairs scored per model call
+
+    Returns:
+        The top_n documents
+    """
+    if len(docs) <= 1:
+        return docs[:top_n]
+
+    deadline = time.perf_counter() + budget_ms / 1000
+    scored = []
+    try:
+        model = get_reranker()
+        for start in range(0, len(docs), batch_size):
+            if time.perf_counter() >= deadline:
+                break
+            batch = docs[start:start + batch_size]
+            scores = model.predict([(query, doc.page_content) for doc in batch], batch_size=batch_size)
+            scored.extend((float(score), start + i) for i, score in enumerate(scores))
+    except Exception as e:
+        print(f"Rerank error: {e}")
+        scored = []
+
+    if not scored:
+        RERANK_RUNS.inc(outcome="skipped")
+        return docs[:top_n]
+
+    RERANK_RUNS.inc(outcome="complete" if len(scored) == len(docs) else "partial")
+    scored.sort(key=lambda pair: pair[0], reverse=True)
+    order = [i for _, i in scored] + list(range(len(scored), len(docs)))
+    return [docs[i] for i in order[:top_n]]
@@ -0,0 +1,72 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from config import RETRIEVAL_SERVICE_URL, RETRIEVAL_TIMEOUT, RETRIEVAL_POOL_SIZE
+
+
+class RetrievedDoc:
+    """Minimal stand-in for a LangChain Document, so thin workers don't import LangChain"""
+
+    def __init__(self, page_content, metadata=None):
+        self.page_content = page_content
+        self.metadata = metadata or {}
+
+    def __repr__(self):
+        return f"RetrievedDoc({self.page_content[:40]!r}, {self.metadata!r})"
+
+
+class RetrievalClient:
+    """HTTP client for retrieval_server.py over a pooled keep-alive session"""
+
+    def __init__(self, base_url=RETRIEVAL_SERVICE_URL, timeout=RETRIEVAL_TIMEOUT, pool_size=RETRIEVAL_POOL_SIZE):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _post(self, path, payload):
+        response = self.session.post(f"{self.base_url}{path}", json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def embed_documents(self, texts):
+        return self._post("/embed", {"texts": list(texts)})["embeddings"]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    def search(self, embedding=None, k=3, collections=None, query=None):
+        """Search by embedding (or by query text, embedded server-side); returns [(doc, distance)]"""
+        payload = {"k": k, "collections": collections}
+        if embedding is not None:
+            payload["embedding"] = list(embedding)
+        else:
+            payload["query"] = query
+        results = self._post("/search", payload)["results"]
+        return [(RetrievedDoc(r["content"], r["metadata"]), r["score"]) for r in results]
+
+    def search_batch(self, embeddings, k=3, collections=None):
+        """One request for many query vectors; returns one [(doc, distance)] list per query"""
+        payload = {"embeddings": [list(e) for e in embeddings], "k": k, "collections": collections}
+        rows = self._post("/search_batch", payload)["results"]
+        return [[(RetrievedDoc(r["content"], r["metadata"]), r["score"]) for r in row] for row in rows]
+
+    def health(self):
+        response = self.session.get(f"{self.base_url}/health", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+
+_client = None
+_lock = threading.Lock()
+
+
+def get_retrieval_client():
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = RetrievalClient()
+    return _client
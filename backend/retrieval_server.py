@@ -0,0 +1,163 @@
+# retrieval_server.py
+"""
+Standalone retrieval service: one warm embedding model and FAISS index
+shared by many thin API / Streamlit workers.
+
+Concurrent /embed and /search calls are coalesced into batched model
+forward passes. Index shards are re-read when their files change on
+disk, so ingestion can keep running in the API process.
+
+Run:
+    python retrieval_server.py
+    # then start workers with RETRIEVAL_SERVICE_URL=http://127.0.0.1:8100
+"""
+import asyncio
+from typing import List, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+
+from config import RETRIEVAL_HOST, RETRIEVAL_PORT, RETRIEVAL_BATCH_SIZE, RETRIEVAL_BATCH_WAIT_MS
+from vectorstore import get_embeddings, load_collections, search, search_batch
+from metrics import Histogram, render_prometheus
+
+BATCH_SIZES = Histogram(
+    "retrieval_embed_batch_size",
+    "Texts per batched embedding forward pass",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+
+app = FastAPI()
+
+
+class EmbedRequest(BaseModel):
+    texts: List[str]
+
+
+class SearchRequest(BaseModel):
+    query: Optional[str] = None
+    embedding: Optional[List[float]] = None
+    k: int = 3
+    collections: Optional[List[str]] = None
+
+
+class SearchBatchRequest(BaseModel):
+    embeddings: List[List[float]]
+    k: int = 3
+    collections: Optional[List[str]] = None
+
+
+class EmbeddingBatcher:
+    """Collects embed requests for up to max_wait_ms (or max_batch texts) and embeds them in one call"""
+
+    def __init__(self, max_batch=RETRIEVAL_BATCH_SIZE, max_wait_ms=RETRIEVAL_BATCH_WAIT_MS):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = None
+        self.task = None
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._run())
+
+    async def embed(self, texts):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((texts, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            count = len(items[0][0])
+            deadline = loop.time() + self.max_wait
+            while count < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                items.append(item)
+                count += len(item[0])
+
+            texts = [text for batch, _ in items for text in batch]
+            BATCH_SIZES.observe(len(texts))
+            try:
+                vectors = await run_in_threadpool(get_embeddings().embed_documents, texts)
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            offset = 0
+            for batch, future in items:
+                if not future.done():
+                    future.set_result(vectors[offset:offset + len(batch)])
+                offset += len(batch)
+
+
+batcher = EmbeddingBatcher()
+
+
+@app.on_event("startup")
+async def startup_event():
+    # Warm the model and shards before accepting traffic
+    await run_in_threadpool(get_embeddings)
+    await run_in_threadpool(load_collections)
+    batcher.start()
+    print(f"Retrieval service ready (batch size {batcher.max_batch}, wait {batcher.max_wait * 1000:.0f} ms)")
+
+
+@app.post("/embed")
+async def embed(request: EmbedRequest):
+    if not request.texts:
+        return {"embeddings": []}
+    return {"embeddings": await batcher.embed(request.texts)}
+
+
+@app.post("/search")
+async def search_endpoint(request: SearchRequest):
+    if request.embedding is None and not request.query:
+        raise HTTPException(status_code=400, detail="Provide either query or embedding")
+    embedding = request.embedding
+    if embedding is None:
+        embedding = (await batcher.embed([request.query]))[0]
+
+    results = await run_in_threadpool(search, embedding, request.k, request.collections)
+    return {
+        "results": [
+            {"content": doc.page_content, "metadata": doc.metadata, "score": float(score)}
+            for doc, score in results
+        ]
+    }
+
+
+@app.post("/search_batch")
+async def search_batch_endpoint(request: SearchBatchRequest):
+    rows = await run_in_threadpool(search_batch, request.embeddings, request.k, request.collections)
+    return {
+        "results": [
+            [{"content": doc.page_content, "metadata": doc.metadata, "score": float(score)} for doc, score in row]
+            for row in rows
+        ]
+    }
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "collections": list(load_collections())}
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host=RETRIEVAL_HOST, port=RETRIEVAL_PORT)
@@ -0,0 +1,142 @@
+# retriever.py
+"""
+Single entry point for query embedding and vector search.
+
+Uses the shared retrieval service when RETRIEVAL_SERVICE_URL is set,
+otherwise the in-process embedding model and FAISS shards.
+
+Query embeddings are cached by normalized text, and top-k results by
+(embedding, k, collections, index version), so repeated questions skip
+both the model forward pass and the index scan.
+"""
+import hashlib
+from array import array
+
+from config import RETRIEVAL_SERVICE_URL, EMBEDDING_CACHE_SIZE, RESULT_CACHE_SIZE, RESULT_CACHE_TTL
+from metrics import Counter, stage
+from ttl_cache import TTLCache
+
+CACHE_LOOKUPS = Counter(
+    "retriever_cache_lookups_total",
+    "Retriever cache lookups by cache and result",
+    labelnames=("cache", "result")
+)
+
+# normalized text -> embedding (the model doesn't change while the process runs)
+_embedding_cache = TTLCache(maxsize=EMBEDDING_CACHE_SIZE)
+# (embedding digest, k, collections, index version) -> [(doc, distance)]
+_result_cache = TTLCache(maxsize=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL)
+
+
+def is_remote():
+    return bool(RETRIEVAL_SERVICE_URL)
+
+
+def normalize_query(text):
+    """Case and whitespace folding; the bge tokenizer is uncased, so the embedding is unchanged"""
+    return " ".join(text.lower().split())
+
+
+def _cached(cache, name, key):
+    value = cache.get(key)
+    CACHE_LOOKUPS.inc(cache=name, result="miss" if value is None else "hit")
+    return value
+
+
+def _embed_uncached(texts):
+    if is_remote():
+        from retrieval_client import get_retrieval_client
+        return get_retrieval_client().embed_documents(texts)
+    from vectorstore import get_embeddings
+    return get_embeddings().embed_documents(texts)
+
+
+def embed_query(text):
+    return embed_documents([text])[0]
+
+
+def embed_documents(texts):
+    """Embed texts, computing only the ones not already in the cache (in one model call)"""
+    keys = [normalize_query(text) for text in texts]
+    vectors = [_cached(_embedding_cache, "embedding", key) for key in keys]
+    missing = sorted({key for key, vector in zip(keys, vectors) if vector is None})
+    if missing:
+        computed = dict(zip(missing, _embed_uncached(missing)))
+        for key, vector in computed.items():
+            _embedding_cache.set(key, vector)
+        vectors = [computed[key] if vector is None else vector for key, vector in zip(keys, vectors)]
+    return vectors
+
+
+def index_version():
+    """Current index version (None for the retrieval service, whose results rely on the TTL)"""
+    if is_remote():
+        return None
+    from vectorstore import index_version as local_index_version
+    return local_index_version()
+
+
+def _result_key(embedding, k, collections, version):
+    digest = hashlib.blake2b(array("f", embedding).tobytes(), digest_size=16).hexdigest()
+    return (digest, k, tuple(sorted(collections)) if collections is not None else None, version)
+
+
+def _search_uncached(embedding, k, collections):
+    if is_remote():
+        from retrieval_client import get_retrieval_client
+        return get_retrieval_client().search(embedding=embedding, k=k, collections=collections)
+
+    from vectorstore import load_collections, search as search_local
+    with stage("vectorstore_load"):
+        load_collections(collections)
+    return search_local(embedding, k, collections)
+
+
+def search(embedding, k, collections=None):
+    """Nearest chunks across collections as [(doc, distance)], closest first"""
+    key = _result_key(embedding, k, collections, index_version())
+    results = _cached(_result_cache, "results", key)
+    if results is None:
+        results = _search_uncached(embedding, k, collections)
+        _result_cache.set(key, results)
+    return list(results)
+
+
+def search_batch(embeddings, k, collections=None):
+    """search() for many query vectors at once; one result list per query (cache misses searched together)"""
+    version = index_version()
+    keys = [_result_key(embedding, k, collections, version) for embedding in embeddings]
+    rows = [_cached(_result_cache, "results", key) for key in keys]
+    missing = [i for i, row in enumerate(rows) if row is None]
+    if missing:
+        if is_remote():
+            from retrieval_client import get_retrieval_client
+            found = get_retrieval_client().search_batch([embeddings[i] for i in missing], k=k, collections=collections)
+        else:
+            from vectorstore import load_collections, search_batch as search_batch_local
+            with stage("vectorstore_load"):
+                load_collections(collections)
+            found = search_batch_local([embeddings[i] for i in missing], k, collections)
+        for i, row in zip(missing, found):
+            _result_cache.set(keys[i], row)
+            rows[i] = row
+    return [list(row) for row in rows]
+
+
+def cache_stats():
+    """Size and hit ratio of the embedding and result caches"""
+    return {"embedding": _embedding_cache.stats(), "results": _result_cache.stats()}
+
+
+def clear_caches():
+    _embedding_cache.clear()
+    _result_cache.clear()
+
+
+def health():
+    """Retrieval service status (raises if it is unreachable); local mode reports the loaded collections"""
+    if is_remote():
+        from retrieval_client import get_retrieval_client
+        return get_retrieval_client().health()
+    from vectorstore import list_collections
+    return {"status": "local", "collections": list_collections()}
@@ -0,0 +1,347 @@
+# scrape_cache.py
+"""
+Two-tier cache for scraped page text: a bounded in-process LRU (short
+TTL) in front of Redis.
+
+Keys are namespaced as "<REDIS_KEY_PREFIX>:scrape:v1:<url>", payloads are
+compressed (zstd when installed, else zlib), and admin listing/clearing
+walks the keyspace with SCAN and pipelined TTL/UNLINK batches instead of
+a blocking KEYS call plus one round trip per key.
+
+If Redis is unreachable the local tier keeps working and the connection
+is retried with exponential backoff, so a brief outage does not disable
+the shared cache for the life of the process.
+"""
+import os
+import threading
+import time
+import zlib
+import redis
+from dotenv import load_dotenv
+from metrics import Counter
+from ttl_cache import TTLCache
+
+load_dotenv()
+
+# Redis configuration
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+REDIS_DB = int(os.getenv("REDIS_DB", 0))
+REDIS_KEY_PREFIX = os.getenv("REDIS_KEY_PREFIX", "coe_chat")
+CACHE_EXPIRY = int(os.getenv("CACHE_EXPIRY_HOURS", 24)) * 3600  # Convert hours to seconds
+# zstd, zlib or none; zstd falls back to zlib when the zstandard package is missing
+CACHE_COMPRESSION = os.getenv("CACHE_COMPRESSION", "zstd").lower()
+CACHE_COMPRESS_MIN_BYTES = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", 512))
+# Keys per SCAN step and per pipelined TTL/UNLINK batch
+SCAN_BATCH = int(os.getenv("CACHE_SCAN_BATCH", 500))
+
+# In-process tier; kept shorter than CACHE_EXPIRY since other workers can't invalidate it
+LOCAL_CACHE_SIZE = int(os.getenv("SCRAPE_LOCAL_CACHE_SIZE", 128))
+LOCAL_CACHE_TTL = int(os.getenv("SCRAPE_LOCAL_CACHE_TTL_SECONDS", 300))
+# Reconnect backoff after a failed connection or command
+REDIS_RETRY_MIN_SECONDS = float(os.getenv("REDIS_RETRY_MIN_SECONDS", 1))
+REDIS_RETRY_MAX_SECONDS = float(os.getenv("REDIS_RETRY_MAX_SECONDS", 60))
+
+KEY_PREFIX = f"{REDIS_KEY_PREFIX}:scrape:v1:"
+# Entries written before keys were namespaced, and the marker set once they have been removed
+LEGACY_KEY_PATTERN = "scrape:*"
+LEGACY_CLEANUP_MARKER = f"{REDIS_KEY_PREFIX}:scrape:legacy-cleanup-done"
+
+CACHE_REQUESTS = Counter(
+    "scrape_cache_requests_total",
+    "Scraped-page cache lookups by result",
+    labelnames=("result",)
+)
+CACHE_BYTES = Counter(
+    "scrape_cache_bytes_total",
+    "Bytes written to the scrape cache, before and after compression",
+    labelnames=("kind",)
+)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# One-byte codec marker in front of every payload
+_RAW, _ZLIB, _ZSTD = b"r", b"z", b"s"
+
+if CACHE_COMPRESSION == "zstd" and zstandard is None:
+    print("zstandard not installed; compressing the scrape cache with zlib")
+    CACHE_COMPRESSION = "zlib"
+
+local_cache = TTLCache(maxsize=LOCAL_CACHE_SIZE, ttl=LOCAL_CACHE_TTL)
+
+# Redis client, connected on first use; None while Redis is down
+redis_client = None
+_connect_lock = threading.Lock()
+_retry_at = 0.0
+_retry_delay = REDIS_RETRY_MIN_SECONDS
+
+
+def get_redis_client():
+    """
+    Connect to Redis the first time the cache is needed instead of at import.
+
+    After a failure, returns None until the backoff delay has passed, then
+    tries again (doubling the delay up to REDIS_RETRY_MAX_SECONDS).
+    """
+    global redis_client, _retry_delay
+    if redis_client is not None or time.monotonic() < _retry_at:
+        return redis_client
+    with _connect_lock:
+        if redis_client is not None or time.monotonic() < _retry_at:
+            return redis_client
+        try:
+            client = redis.Redis(
+                host=REDIS_HOST,
+                port=REDIS_PORT,
+                db=REDIS_DB,
+                # Payloads are compressed bytes
+                decode_responses=False,
+                socket_connect_timeout=2,
+                socket_timeout=2
+            )
+            # Test connection
+            client.ping()
+            redis_client = client
+            _retry_delay = REDIS_RETRY_MIN_SECONDS
+            print("Redis connected successfully")
+            threading.Thread(target=drop_legacy_keys, args=(client,), name="scrape-cache-cleanup", daemon=True).start()
+        except Exception as e:
+            _schedule_retry(f"Redis not available: {e}")
+    return redis_client
+
+
+def _schedule_retry(reason):
+    global redis_client, _retry_at, _retry_delay
+    redis_client = None
+    _retry_at = time.monotonic() + _retry_delay
+    print(f"{reason}. Using the local cache only; retrying Redis in {_retry_delay:.0f}s")
+    _retry_delay = min(_retry_delay * 2, REDIS_RETRY_MAX_SECONDS)
+
+
+def _redis_failed(e, operation):
+    """Drop the client after a connection-level error so callers back off instead of waiting on timeouts"""
+    print(f"Redis {operation} error: {e}")
+    if isinstance(e, (redis.ConnectionError, redis.TimeoutError)):
+        with _connect_lock:
+            _schedule_retry("Redis connection lost")
+
+
+def cache_key(url):
+    return f"{KEY_PREFIX}{url}"
+
+
+def encode(text):
+    """Compress page text into a cache payload"""
+    raw = text.encode("utf-8")
+    if len(raw) < CACHE_COMPRESS_MIN_BYTES or CACHE_COMPRESSION == "none":
+        return _RAW + raw
+    if CACHE_COMPRESSION == "zstd":
+        return _ZSTD + zstandard.ZstdCompressor(level=3).compress(raw)
+    return _ZLIB + zlib.compress(raw, 6)
+
+
+def decode(payload):
+    """Inverse of encode()"""
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+    codec, body = payload[:1], payload[1:]
+    if codec == _ZLIB:
+        body = zlib.decompress(body)
+    elif codec == _ZSTD:
+        if zstandard is None:
+            raise ValueError("zstd-compressed cache entry but zstandard is not installed")
+        body = zstandard.ZstdDecompressor().decompress(body)
+    elif codec != _RAW:
+        raise ValueError(f"Unknown cache codec {codec!r}")
+    return body.decode("utf-8")
+
+
+def lookup(url):
+    """Cached page text from the local tier, then Redis; None on a miss"""
+    text = local_cache.get(url)
+    if text is not None:
+        CACHE_REQUESTS.inc(result="local_hit")
+        return text
+
+    client = get_redis_client()
+    if not client:
+        CACHE_REQUESTS.inc(result="miss")
+        return None
+    try:
+        # One round trip for the payload and its remaining TTL
+        pipe = client.pipeline(transaction=False)
+        pipe.get(cache_key(url))
+        pipe.ttl(cache_key(url))
+        payload, ttl = pipe.execute()
+    except Exception as e:
+        _redis_failed(e, "get")
+        CACHE_REQUESTS.inc(result="error")
+        return None
+    if payload is None:
+        CACHE_REQUESTS.inc(result="miss")
+        return None
+    try:
+        text = decode(payload)
+    except Exception as e:
+        print(f"Discarding unreadable cache entry for {url}: {e}")
+        CACHE_REQUESTS.inc(result="error")
+        return None
+    CACHE_REQUESTS.inc(result="hit")
+    # The local copy never outlives the Redis entry
+    local_cache.set(url, text, ttl=min(LOCAL_CACHE_TTL, ttl) if ttl and ttl > 0 else LOCAL_CACHE_TTL)
+    return text
+
+
+def store(url, text, ttl=CACHE_EXPIRY):
+    """Write page text to both tiers; returns True if it reached Redis"""
+    local_cache.set(url, text, ttl=min(LOCAL_CACHE_TTL, ttl))
+    client = get_redis_client()
+    if not client:
+        return False
+    payload = encode(text)
+    try:
+        client.setex(cache_key(url), ttl, payload)
+    except Exception as e:
+        _redis_failed(e, "set")
+        return False
+    CACHE_BYTES.inc(len(text.encode("utf-8")), kind="raw")
+    CACHE_BYTES.inc(len(payload), kind="stored")
+    return True
+
+
+def _batches(client, match=f"{KEY_PREFIX}*"):
+    """SCAN the namespace (or another key pattern) in SCAN_BATCH-sized lists of keys"""
+    batch = []
+    for key in client.scan_iter(match=match, count=SCAN_BATCH):
+        batch.append(key)
+        if len(batch) >= SCAN_BATCH:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _key_url(key):
+    if isinstance(key, bytes):
+        key = key.decode("utf-8")
+    return key[len(KEY_PREFIX):]
+
+
+def clear(url=None):
+    """
+    Delete one URL's entry, or every entry in the namespace.
+
+    Returns:
+        Number of keys removed
+    """
+    if url:
+        local_cache.pop(url)
+    else:
+        local_cache.clear()
+
+    client = get_redis_client()
+    if not client:
+        print("Redis not available")
+        return 0
+    if url:
+        removed = client.unlink(cache_key(url))
+        print(f"Cleared cache for {url}")
+        return removed
+
+    removed = 0
+    for batch in _batches(client):
+        # UNLINK frees memory in a background thread on the server
+        removed += client.unlink(*batch)
+    print(f"Cleared {removed} cached entries" if removed else "No cached entries found")
+    return removed
+
+
+def drop_legacy_keys(client=None):
+    """
+    Delete the un-namespaced "scrape:<url>" entries of the old cache layout.
+
+    Runs once per Redis database: the marker key is only set after a full
+    pass, so an interrupted cleanup is retried on the next connect.
+
+    Returns:
+        Number of keys removed
+    """
+    client = client or get_redis_client()
+    if not client:
+        return 0
+    try:
+        if client.get(LEGACY_CLEANUP_MARKER):
+            return 0
+        removed = 0
+        for batch in _batches(client, match=LEGACY_KEY_PATTERN):
+            removed += client.unlink(*batch)
+        client.set(LEGACY_CLEANUP_MARKER, b"1")
+    except Exception as e:
+        _redis_failed(e, "legacy cleanup")
+        return 0
+    if removed:
+        print(f"Removed {removed} scrape cache entries from the old key layout")
+    return removed
+
+
+def stats():
+    """Hit/miss counts per tier and compression totals since process start"""
+    local_hits = CACHE_REQUESTS.value(result="local_hit")
+    hits = CACHE_REQUESTS.value(result="hit")
+    misses = CACHE_REQUESTS.value(result="miss")
+    lookups = local_hits + hits + misses
+    raw = CACHE_BYTES.value(kind="raw")
+    stored = CACHE_BYTES.value(kind="stored")
+    return {
+        "local_hits": local_hits,
+        "hits": hits,
+        "misses": misses,
+        "errors": CACHE_REQUESTS.value(result="error"),
+        "hit_ratio": (local_hits + hits) / lookups if lookups else 0.0,
+        "local_entries": len(local_cache),
+        "redis_connected": redis_client is not None,
+        "bytes_raw": raw,
+        "bytes_stored": stored,
+        "compression": CACHE_COMPRESSION,
+        "compression_ratio": raw / stored if stored else None
+    }
+
+
+def info(limit=100):
+    """
+    Describe the cache: total entries, up to `limit` entries with their TTL
+    and stored size, and the hit/miss counters.
+    """
+    client = get_redis_client()
+    if not client:
+        return {"status": "Redis not available", "cached_urls": [], "stats": stats()}
+
+    total = 0
+    cached_urls = []
+    for batch in _batches(client):
+        total += len(batch)
+        wanted = batch[:max(0, limit - len(cached_urls))]
+        if not wanted:
+            continue
+        pipe = client.pipeline(transaction=False)
+        for key in wanted:
+            pipe.ttl(key)
+            pipe.strlen(key)
+        replies = pipe.execute()
+        for key, ttl, size in zip(wanted, replies[::2], replies[1::2]):
+            cached_urls.append({
+                "url": _key_url(key),
+                "expires_in_seconds": ttl,
+                "stored_bytes": size
+            })
+
+    return {
+        "status": "connected",
+        "namespace": KEY_PREFIX,
+        "total_cached": total,
+        "cached_urls": cached_urls,
+        "stats": stats()
+    }
@@ -4,8 +4,8 @@ from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urlparse
+from html_extract import parse_html, iter_blocks, format_block, extract_links
 
 class KprietScraper:
     def __init__(self, base_url="https://www.kpriet.ac.in", max_pages=50, headless=True):
@@ -24,29 +24,23 @@ class KprietScraper:
         options.add_experimental_option("excludeSwitches", ["enable-automation"])
         self.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
 
-    def _get_links(self, soup):
+    def _get_links(self, root):
         links = []
         domain = urlparse(self.base_url).netloc
-        for a in soup.find_all("a", href=True):
-            href = a["href"].strip()
-            if href.startswith(("#", "javascript:", "mailto:", "tel:")):
-                continue
-            full_url = urljoin(self.base_url, href).split("#")[0]  # remove anchors
+        for full_url in extract_links(root, self.base_url):
             if urlparse(full_url).netloc != domain:
                 continue
-            if full_url not in self.visited and full_url not in self.to_visit:
+            if full_url not in self.visited and full_url not in self.to_visit and full_url not in links:
                 links.append(full_url)
         return links
 
-    def _extract_text(self, soup):
-        for tag in soup(["script", "style", "noscript", "header", "footer", "nav"]):
-            tag.decompose()
-        texts = []
-        for tag in soup.find_all(["h1", "h2", "h3", "h4", "h5", "p", "li", "td", "th", "span", "div"]):
-            txt = tag.get_text(separator=" ", strip=True)
-            if txt and len(txt) > 10:  # skip tiny fragments
-                texts.append(txt)
-        return " ".join(texts)
+    def _extract_text(self, root):
+        # Headings are always kept; other blocks skip tiny fragments
+        lines = [
+            format_block(block) for block in iter_blocks(root)
+            if block["type"] == "heading" or len(block["text"]) > 10
+        ]
+        return "\n".join(lines)
 
     def scrape(self):
         all_text = ""
@@ -61,15 +55,15 @@ class KprietScraper:
             try:
                 self.driver.get(url)
                 time.sleep(2)
-                soup = BeautifulSoup(self.driver.page_source, "html.parser")
-                page_text = self._extract_text(soup)
+                root = parse_html(self.driver.page_source)
+                page_text = self._extract_text(root)
 
                 if page_text.strip():
                     all_text += page_text + "\n\n"
                     page_count += 1
 
                 self.visited.add(url)
-                new_links = self._get_links(soup)
+                new_links = self._get_links(root)
                 self.to_visit.extend(new_links[:20])  # limit branching
                 print(f"  Scraped: {url} ({page_count}/{self.max_pages})")
 
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key: the first caller runs the
+    function, callers that arrive while it is running wait and share its
+    result (or exception). Nothing is cached once the call completes.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.shared += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        return {"executed": self.executed, "shared": self.shared, "in_flight": len(self._calls)}
+
+
+class AsyncSingleFlight:
+    """
+    asyncio version of SingleFlight. The leader's work runs in its own task,
+    so a follower (or the leader) disconnecting doesn't cancel it for the rest.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+        self.executed = 0
+        self.shared = 0
+
+    async def do(self, key, fn, *args, **kwargs):
+        """Await fn(*args, **kwargs) (a coroutine function), or the identical call already in flight"""
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._tasks.pop(key, None) if self._tasks.get(key) is done else None)
+            self.executed += 1
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def in_flight(self, key):
+        return key in self._tasks
+
+    def stats(self):
+        return {"executed": self.executed, "shared": self.shared, "in_flight": len(self._tasks)}
@@ -0,0 +1,23 @@
+from html_extract import extract_text
+
+PAGE = "<html><body><h2>About</h2><p>The Principal’s café is open.</p></body></html>"
+
+
+def test_str_input_keeps_non_ascii_text():
+    # Selenium's page_source is already decoded and has no <meta charset>
+    assert extract_text(PAGE) == "## About\nThe Principal’s café is open."
+
+
+def test_str_input_with_encoding_declaration():
+    page = '<?xml version="1.0" encoding="utf-8"?>' + PAGE
+    assert "Principal’s café" in extract_text(page)
+
+
+def test_bytes_input_uses_given_encoding():
+    assert "Principal’s café" in extract_text(PAGE.encode("utf-8"), encoding="utf-8")
+    assert "café" in extract_text(PAGE.replace("’", "'").encode("cp1252"), encoding="cp1252")
+
+
+def test_bytes_input_uses_meta_charset():
+    page = PAGE.replace("<html>", '<html><head><meta charset="utf-8"></head>')
+    assert "Principal’s café" in extract_text(page.encode("utf-8"))
@@ -1,7 +1,215 @@
-from langchain.vectorstores import FAISS
-from langchain.embeddings import HuggingFaceEmbeddings
-from config import FAISS_INDEX_PATH
+import os
+import re
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import FAISS_INDEX_PATH, SEARCH_WORKERS
 
-def load_vectorstore():
-    embeddings = HuggingFaceEmbeddings(model_name="BAAI/bge-small-en-v1.5")
-    return FAISS.load_local(FAISS_INDEX_PATH, embeddings, allow_dangerous_deserialization=True)
\ No newline at end of file
+EMBEDDING_MODEL = "BAAI/bge-small-en-v1.5"
+
+# The index stored directly in FAISS_INDEX_PATH (the pre-sharding layout)
+DEFAULT_COLLECTION = "default"
+_COLLECTION_NAME = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+_lock = threading.Lock()
+_embeddings = None
+# index path -> (mtimes of index.faiss and index.pkl, FAISS store)
+_stores = {}
+# Bumped on every in-memory change to a shard (see index_version)
+_version = 0
+_search_pool = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="faiss-search")
+
+def get_embeddings():
+    """Process-wide embedding model; the first call loads sentence-transformers"""
+    global _embeddings
+    if _embeddings is None:
+        with _lock:
+            if _embeddings is None:
+                from langchain.embeddings import HuggingFaceEmbeddings
+                _embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+    return _embeddings
+
+_INDEX_FILES = ("index.faiss", "index.pkl")
+
+def _index_mtime(index_path):
+    """mtimes of both index files (None unless both exist), so a rewrite of either one is noticed"""
+    try:
+        return tuple(os.path.getmtime(os.path.join(index_path, name)) for name in _INDEX_FILES)
+    except OSError:
+        return None
+
+def has_index(index_path=None):
+    """Whether a complete index (index.faiss and index.pkl) was saved at this path"""
+    index_path = index_path or FAISS_INDEX_PATH
+    return all(os.path.isfile(os.path.join(index_path, name)) for name in _INDEX_FILES)
+
+def validate_collection(name):
+    if not name or not _COLLECTION_NAME.match(name):
+        raise ValueError(f"Invalid collection name: {name!r}")
+    return name
+
+def collection_path(name):
+    """Directory of a collection's shard ('default' is the legacy index at FAISS_INDEX_PATH)"""
+    validate_collection(name)
+    if name == DEFAULT_COLLECTION:
+        return FAISS_INDEX_PATH
+    return os.path.join(FAISS_INDEX_PATH, name)
+
+def list_collections():
+    """Names of the collections that have an index on disk"""
+    names = []
+    if _index_mtime(FAISS_INDEX_PATH) is not None:
+        names.append(DEFAULT_COLLECTION)
+    if os.path.isdir(FAISS_INDEX_PATH):
+        for entry in sorted(os.listdir(FAISS_INDEX_PATH)):
+            if _COLLECTION_NAME.match(entry) and _index_mtime(os.path.join(FAISS_INDEX_PATH, entry)) is not None:
+                names.append(entry)
+    return names
+
+def load_vectorstore(index_path=None):
+    """
+    Load the FAISS index, reusing the in-memory copy until the files on disk change.
+    """
+    from langchain.vectorstores import FAISS
+
+    index_path = index_path or FAISS_INDEX_PATH
+    mtime = _index_mtime(index_path)
+    cached = _stores.get(index_path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    embeddings = get_embeddings()
+    with _lock:
+        cached = _stores.get(index_path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        vectorstore = FAISS.load_local(index_path, embeddings, allow_dangerous_deserialization=True)
+        _stores[index_path] = (mtime, vectorstore)
+    return vectorstore
+
+def load_collections(collections=None):
+    """Load the requested (default: all) collections; returns {name: store}"""
+    available = list_collections()
+    names = available if collections is None else [c for c in collections if c in available]
+    return {name: load_vectorstore(collection_path(name)) for name in names}
+
+def remember_vectorstore(vectorstore, index_path=None):
+    """Record a store that was just saved so the next load doesn't re-read it from disk"""
+    global _version
+    index_path = index_path or FAISS_INDEX_PATH
+    with _lock:
+        _stores[index_path] = (_index_mtime(index_path), vectorstore)
+        _version += 1
+
+def save_vectorstore(vectorstore, index_path=None):
+    """
+    Save a store and make it the loaded one. The files are written to a
+    temporary directory and moved into place with os.replace, so a reader
+    never loads a half-written index.faiss or index.pkl; a load that falls
+    between the two replaces is redone, as the cache keys on both mtimes.
+    """
+    index_path = index_path or FAISS_INDEX_PATH
+    os.makedirs(index_path, exist_ok=True)
+    # A dot name is never taken for a collection (see list_collections)
+    staging = tempfile.mkdtemp(prefix=".saving-", dir=index_path)
+    try:
+        vectorstore.save_local(staging)
+        for name in _INDEX_FILES:
+            os.replace(os.path.join(staging, name), os.path.join(index_path, name))
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    remember_vectorstore(vectorstore, index_path)
+
+def index_version():
+    """
+    Changes whenever any shard's contents may have changed: a write in this
+    process, or a shard file rewritten on disk by another process.
+    """
+    return (_version, tuple((name, _index_mtime(collection_path(name))) for name in list_collections()))
+
+def is_loaded(index_path=None):
+    return (index_path or FAISS_INDEX_PATH) in _stores
+
+def _search_one(name, vectorstore, embedding, k):
+    # Same copied documents (with collection and chunk_id) as search_batch, so cached results are interchangeable
+    return _search_batch_one(name, vectorstore, [embedding], k)[0]
+
+def search(embedding, k, collections=None):
+    """
+    Search collections for the nearest chunks and merge them by distance.
+
+    Shards are searched in parallel (FAISS releases the GIL); a single
+    shard is searched inline.
+
+    Args:
+        embedding: Query embedding
+        k: Number of chunks to return
+        collections: Collection names to search (default: all)
+
+    Returns:
+        List of (Document, distance), closest first; each document is a copy
+        carrying its collection and docstore id (metadata["chunk_id"])
+    """
+    stores = load_collections(collections)
+    if not stores:
+        return []
+    if len(stores) == 1:
+        (name, vectorstore), = stores.items()
+        return _search_one(name, vectorstore, embedding, k)
+
+    futures = [_search_pool.submit(_search_one, name, vs, embedding, k) for name, vs in stores.items()]
+    merged = [pair for future in futures for pair in future.result()]
+    merged.sort(key=lambda pair: pair[1])
+    return merged[:k]
+
+def _search_batch_one(name, vectorstore, embeddings, k):
+    """One FAISS search call for all query vectors against one shard"""
+    import numpy as np
+
+    if not vectorstore.index.ntotal:
+        return [[] for _ in embeddings]
+    vectors = np.asarray(embeddings, dtype="float32")
+    if getattr(vectorstore, "_normalize_L2", False):
+        import faiss
+        faiss.normalize_L2(vectors)
+    distances, indices = vectorstore.index.search(vectors, min(k, vectorstore.index.ntotal))
+
+    results = []
+    for row_distances, row_indices in zip(distances, indices):
+        row = []
+        for distance, i in zip(row_distances, row_indices):
+            if i == -1:
+                continue
+            doc_id = vectorstore.index_to_docstore_id[i]
+            doc = vectorstore.docstore.search(doc_id)
+            # Skip the empty placeholder document of otherwise empty shards
+            if not getattr(doc, "page_content", None):
+                continue
+            # Copy so the chunk id/collection aren't written back into the saved docstore
+            doc = type(doc)(page_content=doc.page_content, metadata={**doc.metadata, "collection": name, "chunk_id": doc_id})
+            row.append((doc, float(distance)))
+        results.append(row)
+    return results
+
+def search_batch(embeddings, k, collections=None):
+    """
+    Batched version of search(): every query vector goes to each shard in a
+    single FAISS search call, then the per-shard hits are merged per query.
+
+    Returns:
+        One list of (Document, distance) per query, closest first; each
+        document carries its docstore id as metadata["chunk_id"]
+    """
+    if not len(embeddings):
+        return []
+    stores = load_collections(collections)
+    merged = [[] for _ in embeddings]
+    futures = [_search_pool.submit(_search_batch_one, name, vs, embeddings, k) for name, vs in stores.items()]
+    for future in futures:
+        for row, hits in zip(merged, future.result()):
+            row.extend(hits)
+    for row in merged:
+        row.sort(key=lambda pair: pair[1])
+        del row[k:]
+    return merged